@@ -6,13 +6,19 @@ Requires CVAT API token. Set via environment variable CVAT_API_TOKEN.
 
 import argparse
 import os
+import random
 import sys
+import tempfile
 import time
 import zipfile
-from io import BytesIO
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 def parse_args() -> argparse.Namespace:
@@ -51,6 +57,21 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Archives with fewer members than this are extracted serially
+PARALLEL_EXTRACT_MIN_MEMBERS = 64
+
+# Export status polling backoff (seconds)
+POLL_INITIAL_DELAY = 0.5
+POLL_MAX_DELAY = 15.0
+
+
+def _poll_delay(attempt: int) -> float:
+    """Exponential backoff delay with jitter for the given poll attempt."""
+    return min(POLL_MAX_DELAY, POLL_INITIAL_DELAY * 2**attempt + random.random() * 0.25)
+
+
 class CVATClient:
     """Simple CVAT API client."""
 
@@ -59,6 +80,15 @@ class CVATClient:
         self.session = requests.Session()
         self.session.headers["Authorization"] = f"Token {token}"
 
+        # Pooled keep-alive connections with retries on gateway errors
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(total=5, backoff_factor=0.5, status_forcelist=[502, 503, 504]),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
     def get_project(self, project_id: int) -> dict:
         """Get project details."""
         resp = self.session.get(f"{self.base_url}/api/projects/{project_id}")
@@ -68,38 +98,59 @@ class CVATClient:
     def export_project(
         self,
         project_id: int,
+        output: BinaryIO,
         export_format: str = "YOLO 1.1",
         include_images: bool = False,
-    ) -> bytes:
-        """Export project annotations."""
+    ) -> None:
+        """Export project annotations.
+
+        The export archive is streamed into ``output`` in chunks and the
+        file is rewound to the start, ready to be opened as a ZIP.
+        """
         # Start export task
         params = {
             "format": export_format,
             "save_images": str(include_images).lower(),
         }
-        resp = self.session.get(
-            f"{self.base_url}/api/projects/{project_id}/dataset",
-            params=params,
-        )
+        url = f"{self.base_url}/api/projects/{project_id}/dataset"
+        resp = self.session.get(url, params=params, stream=True)
 
         # If 202, export is processing
         if resp.status_code == 202:
             print("Export started, waiting for completion...")
-            while True:
-                time.sleep(2)
-                resp = self.session.get(
-                    f"{self.base_url}/api/projects/{project_id}/dataset",
-                    params=params,
-                )
-                if resp.status_code == 200:
-                    break
-                elif resp.status_code != 202:
+            # Prefer the lightweight status probe; servers whose dataset
+            # endpoint rejects it are polled with the original request
+            poll_params = {**params, "action": "status"}
+            attempt = 0
+            while resp.status_code == 202:
+                # Poll status only; the body of a streamed response is never read
+                resp.close()
+                time.sleep(_poll_delay(attempt))
+                attempt += 1
+                resp = self.session.get(url, params=poll_params, stream=True)
+                if 400 <= resp.status_code < 500 and poll_params is not params:
+                    resp.close()
+                    poll_params = params
+                    resp = self.session.get(url, params=poll_params, stream=True)
+                if resp.status_code not in (200, 201, 202):
                     resp.raise_for_status()
                 print(".", end="", flush=True)
             print()
 
-        resp.raise_for_status()
-        return resp.content
+        # 201 means the archive is ready; a plain poll may already return it (200)
+        if resp.status_code == 201:
+            resp.close()
+            resp = self.session.get(url, params={**params, "action": "download"}, stream=True)
+
+        with resp:
+            resp.raise_for_status()
+            if resp.status_code != 200:
+                raise requests.exceptions.HTTPError(
+                    f"Unexpected export status: {resp.status_code}", response=resp
+                )
+            for chunk in resp.iter_content(DOWNLOAD_CHUNK_SIZE):
+                output.write(chunk)
+        output.seek(0)
 
     def list_tasks(self, project_id: int) -> list[dict]:
         """List tasks in project."""
@@ -111,6 +162,53 @@ class CVATClient:
         return resp.json().get("results", [])
 
 
+def _is_plain_member(name: str) -> bool:
+    """Check that a member name maps directly under the output directory."""
+    path = PurePosixPath(name)
+    return not path.is_absolute() and ".." not in path.parts
+
+
+def _extract_members(archive_path: Path, members: list[zipfile.ZipInfo], output_dir: Path) -> None:
+    """Extract a subset of members using a dedicated ZipFile handle."""
+    with zipfile.ZipFile(archive_path) as zf:
+        for member in members:
+            zf.extract(member, output_dir)
+
+
+def extract_archive(archive_path: Path, output_dir: Path) -> None:
+    """Extract a ZIP archive, fanning members out across worker threads.
+
+    zlib releases the GIL while inflating, so image-heavy exports scale with
+    core count. Each worker opens its own ZipFile, as a shared handle is not
+    safe for concurrent reads.
+    """
+    with zipfile.ZipFile(archive_path) as zf:
+        infos = zf.infolist()
+        members = [info for info in infos if not info.is_dir()]
+        if len(members) < PARALLEL_EXTRACT_MIN_MEMBERS or not all(
+            _is_plain_member(info.filename) for info in infos
+        ):
+            zf.extractall(output_dir)
+            return
+
+    # Create directories up front so workers don't race on makedirs
+    dirs = {PurePosixPath(info.filename) for info in infos if info.is_dir()}
+    dirs.update(PurePosixPath(info.filename).parent for info in members)
+    for directory in dirs:
+        (output_dir / directory).mkdir(parents=True, exist_ok=True)
+
+    workers = min(os.cpu_count() or 1, len(members))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(
+            executor.map(
+                _extract_members,
+                repeat(archive_path),
+                [members[i::workers] for i in range(workers)],
+                repeat(output_dir),
+            )
+        )
+
+
 def main() -> int:
     args = parse_args()
 
@@ -140,17 +238,19 @@ def main() -> int:
 
         # Export annotations
         print(f"\nExporting in format: {args.format}")
-        export_data = client.export_project(
-            args.project_id,
-            args.format,
-            args.include_images,
-        )
-
-        # Extract zip
-        output_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            archive_path = Path(tmp_dir) / "export.zip"
+            with open(archive_path, "wb") as f:
+                client.export_project(
+                    args.project_id,
+                    f,
+                    args.format,
+                    args.include_images,
+                )
 
-        with zipfile.ZipFile(BytesIO(export_data)) as zf:
-            zf.extractall(output_dir)
+            # Extract zip
+            output_dir.mkdir(parents=True, exist_ok=True)
+            extract_archive(archive_path, output_dir)
 
         print(f"\nAnnotations exported to: {output_dir}")
 
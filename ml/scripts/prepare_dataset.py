@@ -5,13 +5,21 @@ Converts CVAT annotations to YOLO format and creates train/val/test splits.
 """
 
 import argparse
-import random
+import os
 import shutil
 import sys
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
 import yaml
 
+try:
+    from yaml import CSafeDumper as YamlDumper
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeDumper as YamlDumper
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Prepare dataset for training")
@@ -52,6 +60,13 @@ def parse_args() -> argparse.Namespace:
         default=42,
         help="Random seed for reproducibility",
     )
+    parser.add_argument(
+        "--link-mode",
+        type=str,
+        default="hardlink",
+        choices=["hardlink", "reflink", "copy"],
+        help="How files are placed into splits (hardlinks share data with the source files)",
+    )
     parser.add_argument(
         "--config-output",
         type=str,
@@ -62,27 +77,34 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
 def find_image_label_pairs(
     images_dir: Path,
     annotations_dir: Path,
 ) -> list[tuple[Path, Path]]:
     """Find matching image and label file pairs."""
     pairs = []
-    image_extensions = {".jpg", ".jpeg", ".png", ".bmp"}
 
-    # Find all images
-    for img_path in images_dir.iterdir():
-        if img_path.suffix.lower() not in image_extensions:
-            continue
-
-        # Look for corresponding label file
-        label_name = img_path.stem + ".txt"
-        label_path = annotations_dir / label_name
+    # Index label stems once so matching is a set lookup, not a stat per image
+    with os.scandir(annotations_dir) as it:
+        label_stems = {entry.name[:-4] for entry in it if entry.name.endswith(".txt")}
 
-        if label_path.exists():
-            pairs.append((img_path, label_path))
-        else:
-            print(f"Warning: No label for {img_path.name}")
+    # Find all images
+    with os.scandir(images_dir) as it:
+        for entry in it:
+            name = entry.name
+            dot = name.rfind(".")
+            if dot < 0 or name[dot:].lower() not in IMAGE_EXTENSIONS:
+                continue
+
+            # Look for corresponding label file
+            stem = name[:dot]
+            if stem in label_stems:
+                pairs.append((Path(entry.path), annotations_dir / (stem + ".txt")))
+            else:
+                print(f"Warning: No label for {name}")
 
     return pairs
 
@@ -94,24 +116,55 @@ def split_dataset(
     seed: int,
 ) -> tuple[list, list, list]:
     """Split dataset into train/val/test sets."""
-    random.seed(seed)
-    random.shuffle(pairs)
+    # Shuffle an index array in C rather than moving the tuples in Python
+    order = np.random.default_rng(seed).permutation(len(pairs)).tolist()
 
     n_total = len(pairs)
     n_train = int(n_total * train_ratio)
     n_val = int(n_total * val_ratio)
 
-    train_pairs = pairs[:n_train]
-    val_pairs = pairs[n_train : n_train + n_val]
-    test_pairs = pairs[n_train + n_val :]
+    train_pairs = [pairs[i] for i in order[:n_train]]
+    val_pairs = [pairs[i] for i in order[n_train : n_train + n_val]]
+    test_pairs = [pairs[i] for i in order[n_train + n_val :]]
 
     return train_pairs, val_pairs, test_pairs
 
 
+def _copy_file_range(src: Path, dst: Path) -> None:
+    """Copy via copy_file_range, which shares extents on Btrfs/XFS."""
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+
+
+def _link_or_copy(src: Path, dst: Path, link_mode: str) -> None:
+    """Place src at dst, falling back to cheaper-to-support modes on failure."""
+    if link_mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass  # e.g. cross-device; try reflink next
+
+    if link_mode in ("hardlink", "reflink") and hasattr(os, "copy_file_range"):
+        try:
+            _copy_file_range(src, dst)
+            return
+        except OSError:
+            pass
+
+    shutil.copy(src, dst)
+
+
 def copy_pairs_to_split(
     pairs: list[tuple[Path, Path]],
     output_dir: Path,
     split_name: str,
+    link_mode: str = "hardlink",
 ) -> None:
     """Copy image/label pairs to split directory."""
     images_dir = output_dir / split_name / "images"
@@ -120,9 +173,53 @@ def copy_pairs_to_split(
     images_dir.mkdir(parents=True, exist_ok=True)
     labels_dir.mkdir(parents=True, exist_ok=True)
 
-    for img_path, label_path in pairs:
-        shutil.copy(img_path, images_dir / img_path.name)
-        shutil.copy(label_path, labels_dir / label_path.name)
+    def place_pair(pair: tuple[Path, Path]) -> None:
+        img_path, label_path = pair
+        _link_or_copy(img_path, images_dir / img_path.name, link_mode)
+        _link_or_copy(label_path, labels_dir / label_path.name, link_mode)
+
+    # File syscalls release the GIL, so threads overlap the I/O
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(place_pair, pairs))
+
+
+def _read_label_class_ids(label_file: Path) -> set[int]:
+    """Read class IDs line by line, for label files numpy can't load.
+
+    Scans the raw bytes in place, so lines are never decoded or copied
+    beyond the first token.
+    """
+    class_ids = set()
+    data = label_file.read_bytes()
+    start, length = 0, len(data)
+    while start < length:
+        line_end = data.find(b"\n", start)
+        if line_end < 0:
+            line_end = length
+
+        # Only the first token is needed, so avoid splitting the whole line
+        space = data.find(b" ", start, line_end)
+        if space > start:
+            first = data[start:space]
+        else:
+            # No space, or leading whitespace
+            parts = data[start:line_end].split(maxsplit=1)
+            first = parts[0] if parts else b""
+
+        # Skip comments, as np.loadtxt does
+        if first and not first.startswith(b"#"):
+            try:
+                class_ids.add(int(first))
+            except ValueError:
+                # Tab-separated or otherwise unusual whitespace; skip lines
+                # whose first token still isn't an integer
+                try:
+                    class_ids.add(int(data[start:line_end].split()[0]))
+                except ValueError:
+                    pass
+        start = line_end + 1
+    return class_ids
 
 
 def extract_classes_from_annotations(annotations_dir: Path) -> dict[int, str]:
@@ -135,15 +232,18 @@ def extract_classes_from_annotations(annotations_dir: Path) -> dict[int, str]:
         return {i: name for i, name in enumerate(names)}
 
     # Fall back to extracting unique class IDs from label files
-    class_ids = set()
-    for label_file in annotations_dir.glob("*.txt"):
-        with open(label_file) as f:
-            for line in f:
-                parts = line.strip().split()
-                if parts:
-                    class_ids.add(int(parts[0]))
+    arrays = []
+    with warnings.catch_warnings():
+        # Background images have empty label files
+        warnings.simplefilter("ignore", UserWarning)
+        for label_file in annotations_dir.glob("*.txt"):
+            try:
+                arrays.append(np.loadtxt(label_file, usecols=0, dtype=np.int32, ndmin=1))
+            except ValueError:
+                arrays.append(np.fromiter(_read_label_class_ids(label_file), dtype=np.int32))
 
-    return {i: f"class_{i}" for i in sorted(class_ids)}
+    class_ids = np.unique(np.concatenate(arrays)) if arrays else np.array([], dtype=np.int32)
+    return {int(i): f"class_{int(i)}" for i in class_ids}
 
 
 def create_dataset_config(
@@ -163,7 +263,7 @@ def create_dataset_config(
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with open(output_path, "w") as f:
-        yaml.dump(config, f, default_flow_style=False, sort_keys=False)
+        yaml.dump(config, f, Dumper=YamlDumper, default_flow_style=False, sort_keys=False)
 
 
 def main() -> int:
@@ -208,10 +308,10 @@ def main() -> int:
         shutil.rmtree(output_dir)
 
     # Copy files
-    print("Copying files...")
-    copy_pairs_to_split(train_pairs, output_dir, "train")
-    copy_pairs_to_split(val_pairs, output_dir, "val")
-    copy_pairs_to_split(test_pairs, output_dir, "test")
+    print(f"Copying files (mode: {args.link_mode})...")
+    copy_pairs_to_split(train_pairs, output_dir, "train", args.link_mode)
+    copy_pairs_to_split(val_pairs, output_dir, "val", args.link_mode)
+    copy_pairs_to_split(test_pairs, output_dir, "test", args.link_mode)
 
     # Extract class names
     class_names = extract_classes_from_annotations(annotations_dir)
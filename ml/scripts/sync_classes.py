@@ -14,6 +14,24 @@ from pathlib import Path
 import grpc
 import requests
 import yaml
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from yaml import CSafeDumper as YamlDumper
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeDumper as YamlDumper
+    from yaml import SafeLoader as YamlLoader
+
+
+# Large catalogs can exceed gRPC's 4MB default message limit
+GRPC_CHANNEL_OPTIONS = [
+    ("grpc.max_send_message_length", 64 * 1024 * 1024),
+    ("grpc.max_receive_message_length", 64 * 1024 * 1024),
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+]
 
 
 def parse_args() -> argparse.Namespace:
@@ -51,9 +69,25 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
+def _create_session() -> requests.Session:
+    """Create an HTTP session with pooled keep-alive connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=32,
+        max_retries=Retry(total=5, backoff_factor=0.5, status_forcelist=[502, 503, 504]),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_SESSION = _create_session()
+
+
 def fetch_skus(catalog_url: str) -> list[dict]:
     """Fetch SKUs from catalog service."""
-    resp = requests.get(f"{catalog_url}/api/v1/skus")
+    resp = _SESSION.get(f"{catalog_url}/api/v1/skus")
     resp.raise_for_status()
     return resp.json().get("skus", [])
 
@@ -63,7 +97,7 @@ def update_training_config(config_path: Path, skus: list[dict]) -> None:
     # Load existing config
     if config_path.exists():
         with open(config_path) as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=YamlLoader)
     else:
         config = {}
 
@@ -88,7 +122,7 @@ def update_training_config(config_path: Path, skus: list[dict]) -> None:
     # Save config
     config_path.parent.mkdir(parents=True, exist_ok=True)
     with open(config_path, "w") as f:
-        yaml.dump(config, f, default_flow_style=False, sort_keys=False)
+        yaml.dump(config, f, Dumper=YamlDumper, default_flow_style=False, sort_keys=False)
 
     print(f"Updated config with {len(names)} classes")
 
@@ -99,32 +133,31 @@ def update_ml_server(ml_server: str, skus: list[dict]) -> None:
     sys.path.insert(0, str(Path(__file__).parent.parent / "server"))
     from app.generated import detection_pb2, detection_pb2_grpc
 
-    channel = grpc.insecure_channel(ml_server)
-    stub = detection_pb2_grpc.DetectionServiceStub(channel)
-
-    # Build class mappings
-    classes = []
+    # Build class mappings directly in the request's repeated field
+    request = detection_pb2.SyncClassesRequest()
+    add_class = request.classes.add
     for i, sku in enumerate(skus):
-        class_id = sku.get("class_id", i)
-        classes.append(
-            detection_pb2.ClassMapping(
-                class_id=class_id,
-                sku_id=sku.get("id", str(i)),
-                class_name=sku.get("name", f"beverage_{i}"),
-            )
+        add_class(
+            class_id=sku.get("class_id", i),
+            sku_id=sku.get("id", str(i)),
+            class_name=sku.get("name", f"beverage_{i}"),
         )
 
-    request = detection_pb2.SyncClassesRequest(classes=classes)
-
-    try:
-        response = stub.SyncClasses(request)
-        if response.success:
-            print(f"ML server updated with {response.class_count} classes")
-        else:
-            print("ML server sync failed")
-    except grpc.RpcError as e:
-        print(f"gRPC error: {e.details()}")
-        raise
+    with grpc.insecure_channel(
+        ml_server,
+        options=GRPC_CHANNEL_OPTIONS,
+        compression=grpc.Compression.Gzip,
+    ) as channel:
+        stub = detection_pb2_grpc.DetectionServiceStub(channel)
+        try:
+            response = stub.SyncClasses(request)
+            if response.success:
+                print(f"ML server updated with {response.class_count} classes")
+            else:
+                print("ML server sync failed")
+        except grpc.RpcError as e:
+            print(f"gRPC error: {e.details()}")
+            raise
 
 
 def main() -> int:
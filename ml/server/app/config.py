@@ -12,11 +12,38 @@ class ServerConfig:
     host: str = "0.0.0.0"
     port: int = 50051
     max_workers: int = 10
+    num_workers: int = 1  # processes sharing the port (SO_REUSEPORT), each with its own metrics
+    max_in_flight: int = 32  # images in flight across Detect RPCs before RESOURCE_EXHAUSTED
+
+    # HTTP/2 transport tuning for multi-MB image payloads
+    max_message_mb: int = 50
+    max_concurrent_streams: int = 256
+    max_frame_size: int = 16 * 1024 * 1024 - 1  # HTTP/2 maximum
+    write_buffer_size: int = 1024 * 1024
+    keepalive_time_ms: int = 30000
+    keepalive_timeout_ms: int = 10000
 
     @property
     def address(self) -> str:
         return f"{self.host}:{self.port}"
 
+    @property
+    def grpc_options(self) -> list[tuple[str, int | str]]:
+        """Channel arguments for the gRPC server."""
+        max_message = self.max_message_mb * 1024 * 1024
+        return [
+            ("grpc.max_receive_message_length", max_message),
+            ("grpc.max_send_message_length", max_message),
+            ("grpc.max_concurrent_streams", self.max_concurrent_streams),
+            ("grpc.http2.max_frame_size", self.max_frame_size),
+            ("grpc.http2.write_buffer_size", self.write_buffer_size),
+            ("grpc.http2.bdp_probe", 1),
+            ("grpc.keepalive_time_ms", self.keepalive_time_ms),
+            ("grpc.keepalive_timeout_ms", self.keepalive_timeout_ms),
+            ("grpc.optimization_target", "throughput"),
+            ("grpc.so_reuseport", 1),
+        ]
+
 
 @dataclass
 class ModelConfig:
@@ -24,12 +51,25 @@ class ModelConfig:
 
     model_dir: Path = field(default_factory=lambda: Path("models"))
     model_name: str = "best.pt"
-    watch_interval: float = 5.0  # seconds between model file checks
+    hot_reload_enabled: bool = False  # watch model_path and reload on change
+    watch_interval: float = 10.0  # seconds between polls when inotify is unavailable
 
     # Inference defaults
     default_confidence: float = 0.5
     default_iou: float = 0.45
     input_size: int = 640
+    device: str = ""  # empty selects CUDA when available, else CPU
+    half: bool = True  # FP16 inference, ignored on CPU
+
+    # Micro-batching of concurrent detect calls (max_batch <= 1 disables)
+    max_batch: int = 16
+    batch_wait_ms: float = 5.0
+    gpu_preprocess: bool = True  # letterbox on the GPU instead of in Ultralytics (CPU)
+
+    # Optimized runtime: "pt" (PyTorch), "onnx" (ONNX Runtime) or "engine" (TensorRT).
+    # .onnx/.engine checkpoints are served directly regardless of this setting.
+    engine_format: str = "pt"
+    calibration_data: str = ""  # dataset YAML for INT8 calibration (engine only)
 
     @property
     def model_path(self) -> Path:
@@ -63,14 +103,30 @@ class Config:
                 host=os.getenv("GRPC_HOST", "0.0.0.0"),
                 port=int(os.getenv("GRPC_PORT", "50051")),
                 max_workers=int(os.getenv("GRPC_MAX_WORKERS", "10")),
+                num_workers=int(os.getenv("GRPC_NUM_WORKERS", "1")),
+                max_in_flight=int(os.getenv("GRPC_MAX_IN_FLIGHT", "32")),
+                max_message_mb=int(os.getenv("GRPC_MAX_MESSAGE_MB", "50")),
+                max_concurrent_streams=int(os.getenv("GRPC_MAX_CONCURRENT_STREAMS", "256")),
+                max_frame_size=int(os.getenv("GRPC_MAX_FRAME_SIZE", str(16 * 1024 * 1024 - 1))),
+                write_buffer_size=int(os.getenv("GRPC_WRITE_BUFFER_SIZE", str(1024 * 1024))),
+                keepalive_time_ms=int(os.getenv("GRPC_KEEPALIVE_TIME_MS", "30000")),
+                keepalive_timeout_ms=int(os.getenv("GRPC_KEEPALIVE_TIMEOUT_MS", "10000")),
             ),
             model=ModelConfig(
                 model_dir=Path(os.getenv("MODEL_DIR", "models")),
                 model_name=os.getenv("MODEL_NAME", "best.pt"),
-                watch_interval=float(os.getenv("MODEL_WATCH_INTERVAL", "5.0")),
+                hot_reload_enabled=os.getenv("MODEL_HOT_RELOAD", "false").lower() == "true",
+                watch_interval=float(os.getenv("MODEL_WATCH_INTERVAL", "10.0")),
                 default_confidence=float(os.getenv("DEFAULT_CONFIDENCE", "0.5")),
                 default_iou=float(os.getenv("DEFAULT_IOU", "0.45")),
                 input_size=int(os.getenv("INPUT_SIZE", "640")),
+                device=os.getenv("YOLO_DEVICE", ""),
+                half=os.getenv("MODEL_HALF", "true").lower() == "true",
+                max_batch=int(os.getenv("MAX_BATCH_SIZE", "16")),
+                batch_wait_ms=float(os.getenv("BATCH_WAIT_MS", "5.0")),
+                gpu_preprocess=os.getenv("GPU_PREPROCESS", "true").lower() == "true",
+                engine_format=os.getenv("MODEL_ENGINE_FORMAT", "pt"),
+                calibration_data=os.getenv("CALIB_DATA_YAML", ""),
             ),
             catalog=CatalogConfig(
                 grpc_address=os.getenv("CATALOG_GRPC_ADDRESS", "localhost:8081"),
@@ -1,23 +1,53 @@
 """YOLOv8 detector with hot reload support."""
 
+import contextlib
+import fcntl
 import io
 import logging
+import os
+import queue
+import shutil
+import tempfile
 import threading
 import time
-from dataclasses import dataclass
+from collections.abc import Sequence
+from concurrent.futures import Future
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Optional, Union
 
+import cv2
 import numpy as np
+import torch
+import torch.nn.functional as F
 from PIL import Image
 from ultralytics import YOLO
+from ultralytics.models.yolo.detect import DetectionPredictor
 
 from .config import ModelConfig
 
+try:
+    from turbojpeg import TJPF_BGR, TurboJPEG
+except ImportError:  # optional; JPEGs are decoded with OpenCV instead
+    TurboJPEG = None
+
+try:
+    from watchdog.events import FileSystemEvent, FileSystemEventHandler
+    from watchdog.observers import Observer
+
+    HAS_WATCHDOG = True
+except ImportError:  # optional; the model file is polled instead
+    HAS_WATCHDOG = False
+
+if TYPE_CHECKING:
+    from watchdog.observers.api import BaseObserver
+
 logger = logging.getLogger(__name__)
 
+JPEG_MAGIC = b"\xff\xd8\xff"
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class DetectionResult:
     """Single detection result."""
 
@@ -30,7 +60,7 @@ class DetectionResult:
     y2: float
 
 
-@dataclass
+@dataclass(slots=True)
 class InferenceResult:
     """Complete inference result."""
 
@@ -39,8 +69,67 @@ class InferenceResult:
     model_version: str
 
 
+@dataclass(frozen=True)
+class _LoadedModel:
+    """Model and its version, swapped in as a single reference."""
+
+    model: YOLO
+    version: str
+
+
+@dataclass
+class _BatchRequest:
+    """Decoded image waiting in the micro-batching queue."""
+
+    image: np.ndarray
+    conf: float
+    iou: float
+    future: Future = field(default_factory=Future)
+
+
+class _TensorSourcePredictor(DetectionPredictor):
+    """Detection predictor that keeps tensor sources on the device.
+
+    For a tensor source, Ultralytics copies the whole batch back to the host
+    as the "original" images, although postprocessing only reads their shape.
+    Boxes from letterboxed batches are left in input coordinates here and
+    mapped back by Detector._parse_result.
+    """
+
+    def postprocess(self, preds: Any, img: torch.Tensor, orig_imgs: Any, **kwargs: Any) -> Any:
+        if isinstance(orig_imgs, torch.Tensor):
+            # Zero-stride stand-ins with the input shape; nothing is allocated
+            shape = (*orig_imgs.shape[2:], orig_imgs.shape[1])
+            orig_imgs = [np.broadcast_to(np.uint8(0), shape)] * len(orig_imgs)
+        return super().postprocess(preds, img, orig_imgs, **kwargs)
+
+
+if HAS_WATCHDOG:
+
+    class _ModelFileHandler(FileSystemEventHandler):
+        """Forwards filesystem events for the model file to the watcher."""
+
+        def __init__(self, watcher: "ModelWatcher"):
+            self._watcher = watcher
+
+        def on_any_event(self, event: FileSystemEvent) -> None:
+            if event.is_directory:
+                return
+            # Atomic deploys rename a temp file onto the model path
+            paths = (event.src_path, getattr(event, "dest_path", ""))
+            if any(path and Path(os.fsdecode(path)) == self._watcher.model_path for path in paths):
+                self._watcher._schedule_check()
+
+
 class ModelWatcher:
-    """Watches model file for changes and triggers reload."""
+    """Watches model file for changes and triggers reload.
+
+    Uses OS file notifications (inotify, FSEvents, ...) via watchdog when
+    available, and falls back to polling the file's mtime otherwise.
+    """
+
+    # Waits for writes to settle before reloading a model that is being copied
+    DEBOUNCE_SECONDS = 0.5
 
     def __init__(
         self,
@@ -53,7 +142,11 @@ class ModelWatcher:
         self.interval = interval
         self._last_mtime: Optional[float] = None
         self._running = False
+        self._stop_event = threading.Event()
         self._thread: Optional[threading.Thread] = None
+        self._observer: Optional["BaseObserver"] = None
+        self._debounce_timer: Optional[threading.Timer] = None
+        self._debounce_lock = threading.Lock()
 
     def start(self) -> None:
         """Start watching for model changes."""
@@ -61,18 +154,62 @@ class ModelWatcher:
             return
 
         self._running = True
+        self._stop_event.clear()
         self._last_mtime = self._get_mtime()
+
+        if self._start_observer():
+            logger.info(f"Started watching model file: {self.model_path} (notifications)")
+            return
+
         self._thread = threading.Thread(target=self._watch_loop, daemon=True)
         self._thread.start()
-        logger.info(f"Started watching model file: {self.model_path}")
+        logger.info(f"Started watching model file: {self.model_path} (polling)")
 
     def stop(self) -> None:
         """Stop watching."""
         self._running = False
+        self._stop_event.set()
+        if self._observer:
+            self._observer.stop()
+            self._observer.join(timeout=self.interval + 1)
+            self._observer = None
+        with self._debounce_lock:
+            if self._debounce_timer:
+                self._debounce_timer.cancel()
+                self._debounce_timer = None
         if self._thread:
             self._thread.join(timeout=self.interval + 1)
+            self._thread = None
         logger.info("Stopped model watcher")
 
+    def _start_observer(self) -> bool:
+        """Start a native filesystem observer, returning False if unavailable."""
+        if not HAS_WATCHDOG or not self.model_path.parent.is_dir():
+            return False
+
+        observer = Observer()
+        try:
+            observer.schedule(_ModelFileHandler(self), str(self.model_path.parent), recursive=False)
+            observer.start()
+        except OSError as e:
+            # e.g. inotify watch limit reached or unsupported filesystem
+            logger.warning(f"File notifications unavailable, polling instead: {e}")
+            return False
+
+        self._observer = observer
+        return True
+
+    def _schedule_check(self) -> None:
+        """Check for a change once events stop arriving for the debounce window."""
+        with self._debounce_lock:
+            if not self._running:
+                return
+            if self._debounce_timer:
+                self._debounce_timer.cancel()
+            self._debounce_timer = threading.Timer(self.DEBOUNCE_SECONDS, self._check_for_change)
+            self._debounce_timer.daemon = True
+            self._debounce_timer.start()
+
     def _get_mtime(self) -> Optional[float]:
         """Get model file modification time."""
         try:
@@ -80,22 +217,25 @@ class ModelWatcher:
         except FileNotFoundError:
             return None
 
-    def _watch_loop(self) -> None:
-        """Main watch loop."""
-        while self._running:
-            time.sleep(self.interval)
-            current_mtime = self._get_mtime()
+    def _check_for_change(self) -> None:
+        """Trigger a reload if the model file is newer than last seen."""
+        current_mtime = self._get_mtime()
 
-            if current_mtime is None:
-                continue
+        if current_mtime is None:
+            return
 
-            if self._last_mtime is None or current_mtime > self._last_mtime:
-                logger.info("Model file changed, triggering reload...")
-                self._last_mtime = current_mtime
-                try:
-                    self.on_change()
-                except Exception as e:
-                    logger.error(f"Error during model reload: {e}")
+        if self._last_mtime is None or current_mtime > self._last_mtime:
+            logger.info("Model file changed, triggering reload...")
+            self._last_mtime = current_mtime
+            try:
+                self.on_change()
+            except Exception as e:
+                logger.error(f"Error during model reload: {e}")
+
+    def _watch_loop(self) -> None:
+        """Fallback polling loop."""
+        while not self._stop_event.wait(self.interval):
+            self._check_for_change()
 
 
 class Detector:
@@ -103,30 +243,57 @@ class Detector:
 
     def __init__(self, config: ModelConfig):
         self.config = config
-        self._model: Optional[YOLO] = None
-        self._model_lock = threading.RLock()
-        self._model_version: str = "unknown"
+        # Readers take one snapshot of this reference and never lock;
+        # load_model replaces it with a single assignment
+        self._loaded: Optional[_LoadedModel] = None
+        self._reload_lock = threading.Lock()  # serializes concurrent reloads
         self._class_mapping: dict[int, tuple[str, str]] = {}  # class_id -> (sku_id, name)
+        self._sku_by_id: list[str] = []  # dense class_id -> sku_id, "" where unmapped
         self._watcher: Optional[ModelWatcher] = None
+        self._jpeg_decoder: Optional["TurboJPEG"] = None
+        self._jpeg_decoder_failed = False
+
+        # Micro-batching queue, drained by a worker started on first use
+        self._batch_queue: queue.Queue[_BatchRequest] = queue.Queue()
+        self._batch_thread: Optional[threading.Thread] = None
+        self._batch_thread_lock = threading.Lock()
+
+        # FP16 only pays off on GPU; on CPU it is slower than FP32
+        self._device = config.device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self._half = config.half and self._device != "cpu"
+        # Ultralytics accepts bare GPU indices ("0"), torch does not
+        self._torch_device = f"cuda:{self._device}" if self._device.isdigit() else self._device
+        self._warmup_input: Optional[torch.Tensor] = None
+
+        # Letterbox on the GPU from a pinned staging buffer (one per thread)
+        self._gpu_preprocess = config.gpu_preprocess and self._device != "cpu"
+        self._staging = threading.local()
+        self._stream: Optional[torch.cuda.Stream] = None  # created on first inference
+        self._predict_lock = threading.Lock()  # serializes _infer across threads
+
+        if self._device != "cpu":
+            # Input size is fixed, so cuDNN autotunes once per batch size and load
+            # warm-up covers the batch sizes the batcher produces
+            torch.backends.cudnn.benchmark = True
 
     @property
     def model_loaded(self) -> bool:
         """Check if model is loaded."""
-        with self._model_lock:
-            return self._model is not None
+        return self._loaded is not None
 
     @property
     def model_version(self) -> str:
         """Get current model version."""
-        return self._model_version
+        loaded = self._loaded
+        return loaded.version if loaded is not None else "unknown"
 
     @property
     def class_names(self) -> list[str]:
         """Get class names from model."""
-        with self._model_lock:
-            if self._model is None:
-                return []
-            return list(self._model.names.values())
+        loaded = self._loaded
+        if loaded is None:
+            return []
+        return list(loaded.model.names.values())
 
     def load_model(self) -> bool:
         """Load or reload the model."""
@@ -136,19 +303,36 @@ class Detector:
             logger.warning(f"Model file not found: {model_path}")
             return False
 
-        try:
-            logger.info(f"Loading model from {model_path}...")
-            new_model = YOLO(str(model_path))
+        with self._reload_lock:
+            return self._load_model(model_path)
 
-            # Warm up the model
-            dummy_input = np.zeros((self.config.input_size, self.config.input_size, 3), dtype=np.uint8)
-            new_model.predict(dummy_input, verbose=False)
+    def _load_model(self, model_path: Path) -> bool:
+        """Build and warm up a new model, then swap it in."""
+        try:
+            load_path = self._export_model(model_path)
+            logger.info(f"Loading model from {load_path}...")
+            new_model = YOLO(str(load_path))
+            if load_path.suffix == ".pt":
+                new_model.to(self._torch_device)
+
+            # Warm up twice per batch size: cuDNN autotunes each new input
+            # shape and settles its kernel choice on the second pass
+            warmup_input = self._get_warmup_input()
+            with torch.inference_mode():
+                for batch_size in self._warmup_batch_sizes():
+                    for _ in range(2):
+                        new_model.predict(
+                            warmup_input[:batch_size],
+                            half=self._half,
+                            device=self._device,
+                            verbose=False,
+                            predictor=_TensorSourcePredictor,
+                        )
 
-            with self._model_lock:
-                self._model = new_model
-                self._model_version = self._compute_version(model_path)
+            loaded = _LoadedModel(model=new_model, version=self._compute_version(model_path))
+            self._loaded = loaded
 
-            logger.info(f"Model loaded successfully. Version: {self._model_version}")
+            logger.info(f"Model loaded successfully. Version: {loaded.version}")
             logger.info(f"Classes: {self.class_names}")
             return True
 
@@ -156,6 +340,114 @@ class Detector:
             logger.error(f"Failed to load model: {e}")
             return False
 
+    def _warmup_batch_sizes(self) -> list[int]:
+        """Batch sizes to warm up: powers of two up to max_batch, and max_batch.
+
+        The micro-batcher produces every size up to max_batch; warming the
+        buckets moves most of cuDNN's per-shape autotuning out of the
+        request path. CPU inference does no autotuning, so one pass is enough.
+        """
+        if self._device == "cpu":
+            return [1]
+        max_batch = max(1, self.config.max_batch)
+        sizes = [1 << i for i in range(max_batch.bit_length()) if 1 << i < max_batch]
+        return sizes + [max_batch]
+
+    def _get_warmup_input(self) -> torch.Tensor:
+        """Get the device-resident warm-up batch, reused across reloads.
+
+        Sized for the largest warm-up batch; smaller ones are slices of it.
+        """
+        if self._warmup_input is None:
+            size = self.config.input_size
+            dtype = torch.float16 if self._half else torch.float32
+            self._warmup_input = torch.zeros(
+                (self._warmup_batch_sizes()[-1], 3, size, size),
+                device=self._torch_device,
+                dtype=dtype,
+            )
+        return self._warmup_input
+
+    def export_model(self) -> Optional[Path]:
+        """Build the cached export of the checkpoint without loading it.
+
+        Lets a parent process export once before starting server workers,
+        which then find the finished file in the cache.
+
+        Returns:
+            Path the model would be loaded from, or None if there is no checkpoint
+        """
+        model_path = self.config.model_path
+        if not model_path.exists():
+            return None
+        return self._export_model(model_path)
+
+    def _export_model(self, model_path: Path) -> Path:
+        """Export the checkpoint to the configured engine format.
+
+        The export is cached next to the checkpoint under a name carrying
+        its build parameters (e.g. ``best.b16.fp16.640.engine``) and reused
+        until the checkpoint is newer. Falls back to the checkpoint if
+        export fails.
+        """
+        engine_format = self.config.engine_format
+        if engine_format == "pt" or model_path.suffix != ".pt":
+            return model_path
+
+        # Dynamic batch axis sized for the batcher; static exports take batch 1
+        batch = max(1, self.config.max_batch)
+        export_args: dict[str, Any] = {"batch": batch, "dynamic": True}
+        precision = "fp16" if self._half else "fp32"
+        if engine_format == "engine":
+            export_args["workspace"] = 4
+            # Ultralytics only calibrates INT8 for TensorRT; ONNX stays float
+            if self.config.calibration_data:
+                export_args["int8"] = True
+                export_args["data"] = self.config.calibration_data
+                precision = "int8"
+
+        export_path = model_path.with_name(
+            f"{model_path.stem}.b{batch}.{precision}.{self.config.input_size}.{engine_format}"
+        )
+
+        def is_fresh() -> bool:
+            return export_path.exists() and (
+                export_path.stat().st_mtime >= model_path.stat().st_mtime
+            )
+
+        if is_fresh():
+            return export_path
+
+        try:
+            # Server worker processes share the cache: the first to take the
+            # lock exports, the others wait for it and reuse the result
+            lock_path = export_path.with_name(f".{export_path.name}.lock")
+            with open(lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                if is_fresh():
+                    return export_path
+
+                logger.info(f"Exporting {model_path} to {export_path.name}...")
+                # Export from a private copy so the result (and any intermediate
+                # ONNX file) never lands half-written at a path others may load
+                with tempfile.TemporaryDirectory(
+                    dir=model_path.parent, prefix=".export-"
+                ) as tmp_dir:
+                    tmp_model = Path(tmp_dir) / model_path.name
+                    shutil.copyfile(model_path, tmp_model)
+                    exported = YOLO(str(tmp_model)).export(
+                        format=engine_format,
+                        imgsz=self.config.input_size,
+                        half=self._half,
+                        device=self._device,
+                        **export_args,
+                    )
+                    os.replace(exported, export_path)
+            return export_path
+        except Exception as e:
+            logger.warning(f"Export to {engine_format} failed, using PyTorch model: {e}")
+            return model_path
+
     def _compute_version(self, model_path: Path) -> str:
         """Compute version string from model file."""
         mtime = model_path.stat().st_mtime
@@ -185,19 +477,34 @@ class Detector:
         Args:
             mapping: Dict of class_id -> (sku_id, class_name)
         """
+        # Class IDs are normally small model indices, so a list indexed by ID
+        # is a cheaper per-detection lookup than the dict. IDs too sparse for
+        # that leave the list empty and are looked up in the dict instead.
+        max_id = max((i for i in mapping if i >= 0), default=-1)
+        sku_by_id: list[str] = []
+        if max_id < 4 * len(mapping) + 1024:
+            sku_by_id = [""] * (max_id + 1)
+            for class_id, (sku_id, _) in mapping.items():
+                if class_id >= 0:
+                    sku_by_id[class_id] = sku_id
+
         self._class_mapping = mapping
+        self._sku_by_id = sku_by_id
         logger.info(f"Updated class mapping with {len(mapping)} classes")
 
     def detect(
         self,
-        image_bytes: bytes,
+        image_bytes: Union[bytes, memoryview],
         confidence_threshold: Optional[float] = None,
         iou_threshold: Optional[float] = None,
     ) -> InferenceResult:
         """Run detection on image.
 
+        Concurrent calls are grouped into micro-batches and run through a
+        single predict call when batching is enabled.
+
         Args:
-            image_bytes: JPEG/PNG image bytes
+            image_bytes: JPEG/PNG image bytes or a buffer over them
             confidence_threshold: Minimum confidence threshold
             iou_threshold: NMS IoU threshold
 
@@ -207,88 +514,332 @@ class Detector:
         Raises:
             RuntimeError: If model is not loaded
         """
-        with self._model_lock:
-            if self._model is None:
-                raise RuntimeError("Model not loaded")
+        return self.submit(image_bytes, confidence_threshold, iou_threshold).result()
+
+    def submit(
+        self,
+        image_bytes: Union[bytes, memoryview],
+        confidence_threshold: Optional[float] = None,
+        iou_threshold: Optional[float] = None,
+    ) -> "Future[InferenceResult]":
+        """Decode an image and queue it for batched inference.
+
+        Decoding runs on the calling thread; the returned future resolves
+        once the batch containing the image has been through the model.
+
+        Args:
+            image_bytes: JPEG/PNG image bytes or a buffer over them
+            confidence_threshold: Minimum confidence threshold
+            iou_threshold: NMS IoU threshold
 
-            # Use defaults if not specified
-            conf = confidence_threshold or self.config.default_confidence
-            iou = iou_threshold or self.config.default_iou
+        Returns:
+            Future resolving to the InferenceResult
 
-            # Decode image
-            image = Image.open(io.BytesIO(image_bytes))
-            if image.mode != "RGB":
-                image = image.convert("RGB")
+        Raises:
+            RuntimeError: If model is not loaded
+        """
+        if not self.model_loaded:
+            raise RuntimeError("Model not loaded")
 
-            # Get original dimensions for normalization
-            orig_width, orig_height = image.size
+        # Use defaults if not specified
+        conf = confidence_threshold or self.config.default_confidence
+        iou = iou_threshold or self.config.default_iou
 
-            # Run inference
+        # Decode image on the calling thread so decoding runs in parallel
+        image = self._decode_image(image_bytes)
+        request = _BatchRequest(image=image, conf=conf, iou=iou)
+
+        if self.config.max_batch <= 1:
+            request.future.set_result(self._infer([image], conf, iou)[0])
+            return request.future
+
+        self._ensure_batch_worker()
+        self._batch_queue.put(request)
+        return request.future
+
+    def warm_up(self) -> None:
+        """Run a blank frame through the full detect path.
+
+        Load-time warm-up only exercises the model; this also touches
+        decoding, the batch worker and the CUDA allocator's input buffers
+        before the first real request.
+        """
+        size = self.config.input_size
+        ok, encoded = cv2.imencode(".jpg", np.full((size, size, 3), 114, dtype=np.uint8))
+        if ok:
+            self.detect(encoded.tobytes())
+
+    def _ensure_batch_worker(self) -> None:
+        """Start the micro-batching worker thread if not running."""
+        if self._batch_thread is not None:
+            return
+        with self._batch_thread_lock:
+            if self._batch_thread is None:
+                self._batch_thread = threading.Thread(target=self._batch_loop, daemon=True)
+                self._batch_thread.start()
+
+    def _batch_loop(self) -> None:
+        """Collect queued requests into batches and run inference."""
+        max_wait = self.config.batch_wait_ms / 1000
+        while True:
+            batch = [self._batch_queue.get()]
+            deadline = time.perf_counter() + max_wait
+            while len(batch) < self.config.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._batch_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                # Never let the worker die; fail whatever is still pending
+                logger.error(f"Batch inference failed: {e}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    def _run_batch(self, batch: list[_BatchRequest]) -> None:
+        """Run inference for one collected batch and resolve its futures."""
+        # Drop requests whose callers cancelled while queued; the rest can
+        # no longer be cancelled, so setting their results is safe
+        batch = [r for r in batch if r.future.set_running_or_notify_cancel()]
+
+        # Thresholds are per predict call, so batch by threshold pair
+        groups: dict[tuple[float, float], list[_BatchRequest]] = {}
+        for request in batch:
+            groups.setdefault((request.conf, request.iou), []).append(request)
+
+        for (conf, iou), requests in groups.items():
+            try:
+                results = self._infer([r.image for r in requests], conf, iou)
+            except Exception as e:
+                for request in requests:
+                    request.future.set_exception(e)
+                continue
+            for request, result in zip(requests, results, strict=True):
+                request.future.set_result(result)
+
+    def _infer(
+        self,
+        images: list[np.ndarray],
+        conf: float,
+        iou: float,
+    ) -> list[InferenceResult]:
+        """Run one predict call over a batch of decoded images."""
+        loaded = self._loaded
+        if loaded is None:
+            raise RuntimeError("Model not loaded")
+
+        # Run inference. The Ultralytics predictor and the CUDA stream are not
+        # thread-safe; the lock only contends when batching is disabled and
+        # executor threads call this directly
+        with self._predict_lock:
             start_time = time.perf_counter()
-            results = self._model.predict(
-                image,
-                conf=conf,
-                iou=iou,
-                imgsz=self.config.input_size,
-                verbose=False,
+            stream = self._get_stream()
+            with (
+                torch.inference_mode(),
+                torch.cuda.stream(stream) if stream is not None else contextlib.nullcontext(),
+            ):
+                source: Union[torch.Tensor, list[np.ndarray]]
+                letterboxes: Sequence[Optional[tuple[float, int, int]]]
+                if self._gpu_preprocess:
+                    source, letterboxes = self._preprocess_batch(images)
+                else:
+                    source, letterboxes = images, [None] * len(images)
+                results = loaded.model.predict(
+                    source,
+                    conf=conf,
+                    iou=iou,
+                    imgsz=self.config.input_size,
+                    half=self._half,
+                    device=self._device,
+                    verbose=False,
+                    predictor=_TensorSourcePredictor,
+                )
+            if stream is not None:
+                # Results are read back on the default stream below
+                stream.synchronize()
+        inference_time = (time.perf_counter() - start_time) * 1000
+
+        return [
+            InferenceResult(
+                detections=self._parse_result(result, image, loaded.model.names, letterbox),
+                inference_time_ms=inference_time,
+                model_version=loaded.version,
             )
-            inference_time = (time.perf_counter() - start_time) * 1000
-
-            # Parse results
-            detections = []
-            if results and len(results) > 0:
-                result = results[0]
-                if result.boxes is not None:
-                    boxes = result.boxes
-                    for i in range(len(boxes)):
-                        class_id = int(boxes.cls[i].item())
-                        confidence = float(boxes.conf[i].item())
-
-                        # Get bbox in xyxy format and normalize
-                        x1, y1, x2, y2 = boxes.xyxy[i].tolist()
-                        x1_norm = x1 / orig_width
-                        y1_norm = y1 / orig_height
-                        x2_norm = x2 / orig_width
-                        y2_norm = y2 / orig_height
-
-                        # Get class name from mapping or model
-                        if class_id in self._class_mapping:
-                            _, class_name = self._class_mapping[class_id]
-                        else:
-                            class_name = self._model.names.get(class_id, f"class_{class_id}")
-
-                        detections.append(
-                            DetectionResult(
-                                class_id=class_id,
-                                class_name=class_name,
-                                confidence=confidence,
-                                x1=x1_norm,
-                                y1=y1_norm,
-                                x2=x2_norm,
-                                y2=y2_norm,
-                            )
-                        )
+            for image, result, letterbox in zip(images, results, letterboxes, strict=True)
+        ]
 
-            return InferenceResult(
-                detections=detections,
-                inference_time_ms=inference_time,
-                model_version=self._model_version,
+    def _get_stream(self) -> Optional[torch.cuda.Stream]:
+        """Get the CUDA stream inference is issued on, or None on CPU."""
+        if self._stream is None and self._torch_device.startswith("cuda"):
+            self._stream = torch.cuda.Stream(device=self._torch_device)
+        return self._stream
+
+    def _preprocess_batch(
+        self,
+        images: list[np.ndarray],
+    ) -> tuple[torch.Tensor, list[tuple[float, int, int]]]:
+        """Letterbox a batch of BGR images on the inference device.
+
+        Images are staged through a reused pinned host buffer so uploads are
+        asynchronous, then flipped to RGB, resized and padded on device.
+
+        Returns:
+            Bx3xSxS input tensor and per-image (ratio, pad_x, pad_y)
+        """
+        size = self.config.input_size
+        dtype = torch.float16 if self._half else torch.float32
+        staging = self._get_staging_buffer(sum(image.nbytes for image in images))
+
+        # Same grey padding Ultralytics' LetterBox uses
+        batch = torch.full(
+            (len(images), 3, size, size), 114 / 255, device=self._torch_device, dtype=dtype
+        )
+        letterboxes = []
+        offset = 0
+        for i, image in enumerate(images):
+            height, width = image.shape[:2]
+            host = staging[offset : offset + image.nbytes].view(height, width, 3)
+            offset += image.nbytes
+            host.copy_(torch.from_numpy(image))
+            upload = host.to(self._torch_device, non_blocking=True)
+
+            # HxWx3 BGR uint8 -> 1x3xHxW RGB in [0, 1]
+            chw = upload.permute(2, 0, 1).flip(0).unsqueeze(0).to(dtype).div_(255)
+            ratio = min(size / height, size / width)
+            new_height, new_width = round(height * ratio), round(width * ratio)
+            if (new_height, new_width) != (height, width):
+                chw = F.interpolate(
+                    chw, size=(new_height, new_width), mode="bilinear", align_corners=False
+                )
+
+            pad_y, pad_x = (size - new_height) // 2, (size - new_width) // 2
+            batch[i, :, pad_y : pad_y + new_height, pad_x : pad_x + new_width] = chw[0]
+            letterboxes.append((ratio, pad_x, pad_y))
+
+        return batch, letterboxes
+
+    def _get_staging_buffer(self, nbytes: int) -> torch.Tensor:
+        """Get this thread's host staging buffer, grown to at least nbytes."""
+        buffer = getattr(self._staging, "buffer", None)
+        if buffer is None or buffer.numel() < nbytes:
+            buffer = torch.empty(nbytes, dtype=torch.uint8, pin_memory=self._device != "cpu")
+            self._staging.buffer = buffer
+        return buffer
+
+    def _parse_result(
+        self,
+        result: Any,
+        image: np.ndarray,
+        model_names: dict[int, str],
+        letterbox: Optional[tuple[float, int, int]] = None,
+    ) -> list[DetectionResult]:
+        """Convert one Ultralytics result into normalized detections.
+
+        ``letterbox`` is the (ratio, pad_x, pad_y) used when the image was
+        preprocessed on device, whose boxes come back in input coordinates.
+        """
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return []
+
+        # Get original dimensions for normalization
+        orig_height, orig_width = image.shape[:2]
+
+        # boxes.data is Nx6 (x1, y1, x2, y2, conf, cls), Nx7 with track IDs;
+        # one device-to-host copy brings every column over together
+        data = boxes.data.cpu().numpy()
+        class_ids = data[:, -1].astype(np.int32).tolist()
+        confidences = data[:, -2].tolist()
+        xyxy = data[:, :4].astype(np.float64)
+        if letterbox is not None:
+            ratio, pad_x, pad_y = letterbox
+            xyxy[:, 0::2] = ((xyxy[:, 0::2] - pad_x) / ratio).clip(0, orig_width)
+            xyxy[:, 1::2] = ((xyxy[:, 1::2] - pad_y) / ratio).clip(0, orig_height)
+        xyxy[:, 0::2] /= orig_width
+        xyxy[:, 1::2] /= orig_height
+
+        class_mapping = self._class_mapping
+        detections = []
+        for class_id, confidence, (x1, y1, x2, y2) in zip(
+            class_ids, confidences, xyxy.tolist(), strict=True
+        ):
+            # Get class name from mapping or model
+            mapped = class_mapping.get(class_id)
+            if mapped is not None:
+                class_name = mapped[1]
+            else:
+                class_name = model_names.get(class_id, f"class_{class_id}")
+
+            detections.append(
+                DetectionResult(
+                    class_id=class_id,
+                    class_name=class_name,
+                    confidence=confidence,
+                    x1=x1,
+                    y1=y1,
+                    x2=x2,
+                    y2=y2,
+                )
             )
+        return detections
+
+    def _get_jpeg_decoder(self) -> Optional["TurboJPEG"]:
+        """Get the libjpeg-turbo decoder, or None if it is unavailable."""
+        if self._jpeg_decoder is None and TurboJPEG is not None and not self._jpeg_decoder_failed:
+            try:
+                self._jpeg_decoder = TurboJPEG()
+            except (OSError, RuntimeError) as e:
+                logger.warning(f"libjpeg-turbo unavailable, decoding with OpenCV: {e}")
+                self._jpeg_decoder_failed = True
+        return self._jpeg_decoder
+
+    def _decode_image(self, image_bytes: Union[bytes, memoryview]) -> np.ndarray:
+        """Decode image bytes to an HxWx3 BGR array, as Ultralytics expects.
+
+        The encoded buffer is wrapped, not copied, before decoding.
+        """
+        buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+        if buffer[:3].tobytes() == JPEG_MAGIC:
+            decoder = self._get_jpeg_decoder()
+            if decoder is not None:
+                try:
+                    decoded: np.ndarray = decoder.decode(buffer, pixel_format=TJPF_BGR)
+                    return decoded
+                except (OSError, ValueError) as e:
+                    # e.g. CMYK or truncated JPEGs, which the fallbacks still decode
+                    logger.debug("libjpeg-turbo rejected image, falling back: %s", e)
+
+        # OpenCV decodes straight to BGR; Pillow covers formats it lacks. EXIF
+        # orientation is ignored, matching libjpeg-turbo and Pillow
+        image = cv2.imdecode(buffer, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+        if image is not None:
+            return image
+
+        pil_image: Image.Image = Image.open(io.BytesIO(image_bytes))
+        if pil_image.mode != "RGB":
+            pil_image = pil_image.convert("RGB")
+        return np.ascontiguousarray(np.asarray(pil_image)[:, :, ::-1])
 
     def get_model_info(self) -> dict:
         """Get model metadata."""
-        with self._model_lock:
-            if self._model is None:
-                return {
-                    "version": "none",
-                    "architecture": "none",
-                    "class_names": [],
-                    "input_size": self.config.input_size,
-                }
-
+        loaded = self._loaded
+        if loaded is None:
             return {
-                "version": self._model_version,
-                "architecture": "yolov8",
-                "class_names": list(self._model.names.values()),
+                "version": "none",
+                "architecture": "none",
+                "class_names": [],
                 "input_size": self.config.input_size,
             }
+
+        return {
+            "version": loaded.version,
+            "architecture": "yolov8",
+            "class_names": list(loaded.model.names.values()),
+            "input_size": self.config.input_size,
+        }
@@ -1,10 +1,17 @@
 """ML Detection Server entry point."""
 
+import asyncio
 import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
 import signal
 import sys
 import time
 from concurrent import futures
+from types import FrameType
+from typing import Optional
 
 import grpc
 
@@ -13,82 +20,158 @@ from .detector import Detector
 from .servicer import DetectionServicer
 
 
-def setup_logging(level: str) -> None:
-    """Configure logging."""
-    logging.basicConfig(
-        level=getattr(logging, level.upper()),
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[logging.StreamHandler(sys.stdout)],
+def setup_logging(level: str) -> logging.handlers.QueueListener:
+    """Configure logging.
+
+    Records are queued by the logging thread and written to stdout by a
+    listener thread, so a slow log consumer cannot stall request handling.
+
+    Returns:
+        The started listener; stop it on shutdown to flush queued records
+    """
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
     )
 
+    # The queue handler only merges args into the message; the listener's
+    # handler applies the real format
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+
+    logging.basicConfig(level=getattr(logging, level.upper()), handlers=[queue_handler])
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    return listener
+
 
-def serve() -> None:
+async def serve() -> None:
     """Start the gRPC server."""
     config = Config.from_env()
-    setup_logging(config.log_level)
+    log_listener = setup_logging(config.log_level)
     logger = logging.getLogger(__name__)
 
-    logger.info("Starting ML Detection Server...")
-    logger.info(f"Configuration: {config}")
+    try:
+        logger.info("Starting ML Detection Server...")
+        logger.info(f"Configuration: {config}")
 
-    # Initialize detector
-    detector = Detector(config.model)
-
-    # Try to load model (may not exist yet)
-    if config.model.model_path.exists():
-        detector.load_model()
-    else:
-        logger.warning(
-            f"Model not found at {config.model.model_path}. "
-            "Server will start but detection unavailable until model is deployed."
+        # Grow CUDA memory in place rather than cudaMalloc'ing new blocks as
+        # batch shapes vary; must be set before CUDA initializes
+        os.environ.setdefault(
+            "PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True,max_split_size_mb:128"
         )
 
-    # Start hot reload watcher
-    detector.start_hot_reload()
-
-    # Create gRPC server
-    server = grpc.server(
-        futures.ThreadPoolExecutor(max_workers=config.server.max_workers),
-        options=[
-            ("grpc.max_receive_message_length", 50 * 1024 * 1024),  # 50MB max
-            ("grpc.max_send_message_length", 50 * 1024 * 1024),
-        ],
-    )
+        # Initialize detector
+        detector = Detector(config.model)
+
+        # Try to load model (may not exist yet)
+        if config.model.model_path.exists():
+            if detector.load_model():
+                detector.warm_up()
+        else:
+            logger.warning(
+                f"Model not found at {config.model.model_path}. "
+                "Server will start but detection unavailable until model is deployed."
+            )
+
+        # Start hot reload watcher
+        if config.model.hot_reload_enabled:
+            detector.start_hot_reload()
+
+        # Create gRPC server; RPCs are handled on the event loop and blocking
+        # inference runs on a bounded thread pool
+        inference_executor = futures.ThreadPoolExecutor(
+            max_workers=config.server.max_workers,
+            thread_name_prefix="inference",
+        )
+        server = grpc.aio.server(options=config.server.grpc_options)
 
-    # Import generated code and register servicer
-    from .generated import detection_pb2_grpc
+        # Import generated code and register servicer
+        from .generated import detection_pb2_grpc
 
-    servicer = DetectionServicer(detector, start_time=time.time())
-    detection_pb2_grpc.add_DetectionServiceServicer_to_server(servicer, server)
+        servicer = DetectionServicer(
+            detector,
+            start_time=time.time(),
+            executor=inference_executor,
+            max_in_flight=config.server.max_in_flight,
+        )
+        detection_pb2_grpc.add_DetectionServiceServicer_to_server(servicer, server)
 
-    # Start server
-    server.add_insecure_port(config.server.address)
-    server.start()
-    logger.info(f"Server started on {config.server.address}")
+        # Start server
+        server.add_insecure_port(config.server.address)
+        await server.start()
+        logger.info(f"Server started on {config.server.address}")
 
-    # Graceful shutdown handling
-    shutdown_event = False
+        # Graceful shutdown handling
+        shutdown_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, shutdown_event.set)
 
-    def handle_shutdown(signum, frame):
-        nonlocal shutdown_event
-        if shutdown_event:
-            return
-        shutdown_event = True
+        # Wait for termination
+        await shutdown_event.wait()
         logger.info("Shutdown signal received, stopping server...")
         detector.stop_hot_reload()
-        server.stop(grace=5)
+        await server.stop(grace=5)
+        inference_executor.shutdown(wait=False)
+        logger.info("Server stopped")
+    finally:
+        # Flush queued records, including any logged while failing
+        log_listener.stop()
+
 
-    signal.signal(signal.SIGTERM, handle_shutdown)
-    signal.signal(signal.SIGINT, handle_shutdown)
+def _run_worker() -> None:
+    """Entry point for a server worker process."""
+    asyncio.run(serve())
 
-    # Wait for termination
-    server.wait_for_termination()
-    logger.info("Server stopped")
+
+def _run_export() -> None:
+    """Entry point for the process that exports the model before workers start."""
+    config = Config.from_env()
+    log_listener = setup_logging(config.log_level)
+    try:
+        Detector(config.model).export_model()
+    finally:
+        log_listener.stop()
 
 
 def main() -> None:
     """Main entry point."""
-    serve()
+    config = Config.from_env()
+    num_workers = config.server.num_workers
+    if num_workers <= 1:
+        asyncio.run(serve())
+        return
+
+    # Each worker loads its own detector and binds the same port with
+    # SO_REUSEPORT; the kernel spreads connections across them. forkserver
+    # keeps workers from inheriting the parent's torch/CUDA state. State
+    # such as GetMetrics counters and synced class mappings is per worker.
+    ctx = multiprocessing.get_context("forkserver")
+
+    if config.model.engine_format != "pt":
+        # Export once, in a short-lived process so the parent never touches
+        # CUDA; workers then load the cached file instead of each exporting
+        # it. Later hot reloads are serialized by a lock on the export.
+        exporter = ctx.Process(target=_run_export, name="ml-server-export")
+        exporter.start()
+        exporter.join()
+
+    workers = [ctx.Process(target=_run_worker, name=f"ml-server-{i}") for i in range(num_workers)]
+    for worker in workers:
+        worker.start()
+
+    def forward_signal(signum: int, frame: Optional[FrameType]) -> None:
+        for worker in workers:
+            if worker.is_alive() and worker.pid is not None:
+                os.kill(worker.pid, signum)
+
+    signal.signal(signal.SIGTERM, forward_signal)
+    signal.signal(signal.SIGINT, forward_signal)
+
+    for worker in workers:
+        worker.join()
 
 
 if __name__ == "__main__":
@@ -1,13 +1,19 @@
 """gRPC service implementation."""
 
+import asyncio
+import functools
+import itertools
 import logging
 import time
-import uuid
-from typing import TYPE_CHECKING
+from collections import deque
+from collections.abc import AsyncIterator
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Optional
 
 import grpc
 
-from .detector import Detector
+from .detector import Detector, InferenceResult
 
 if TYPE_CHECKING:
     from .generated import detection_pb2, detection_pb2_grpc
@@ -15,120 +21,375 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
+class _ServiceMetrics:
+    """Counters behind GetMetrics, only updated from the event loop."""
+
+    requests_total: int = 0
+    images_total: int = 0
+    image_bytes_total: int = 0
+    detections_total: int = 0
+    inference_time_ms_sum: float = 0.0
+    errors_total: int = 0
+    rejected_total: int = 0
+    detect_latencies_ms: deque = field(default_factory=lambda: deque(maxlen=1024))
+
+    def latency_p99_ms(self) -> float:
+        """Get the 99th percentile of recent Detect latencies."""
+        if not self.detect_latencies_ms:
+            return 0.0
+        ordered = sorted(self.detect_latencies_ms)
+        return float(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))])
+
+
 class DetectionServicer:
-    """gRPC Detection Service implementation."""
+    """gRPC Detection Service implementation (asyncio).
+
+    Handlers run on the server's event loop. Image decoding is handed off
+    to ``executor`` and inference is awaited on the detector's batcher, so
+    the loop keeps serving I/O.
+    """
+
+    # How long a request waits for its in-flight slots before shedding load
+    ADMISSION_TIMEOUT = 0.05
+    # Requests a DetectStream reads ahead of the response it is waiting on
+    STREAM_PIPELINE_DEPTH = 8
 
-    def __init__(self, detector: Detector, start_time: float):
+    def __init__(
+        self,
+        detector: Detector,
+        start_time: float,
+        executor: Optional[Executor] = None,
+        max_in_flight: int = 32,
+    ):
+        # Imported here rather than per RPC, and not at module level so the
+        # module stays importable before `make proto` has run
+        from .generated import detection_pb2
+
+        self._pb2: Any = detection_pb2  # module-typed attributes do not compile under mypyc
         self.detector = detector
         self.start_time = start_time
+        self._executor = executor  # None uses the loop's default executor
+        # One slot per image in the model, whichever RPC it arrived on
+        self._max_in_flight = max_in_flight
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        # HealthCheck copies one of these and only sets the uptime
+        self._healthy_response = detection_pb2.HealthResponse(
+            healthy=True, status="healthy", model_loaded=True
+        )
+        self._unhealthy_response = detection_pb2.HealthResponse(
+            healthy=False, status="model_not_loaded", model_loaded=False
+        )
+        # Request IDs only tag log lines; next() on a count is atomic under the GIL
+        self._request_counter = itertools.count()
+        self._metrics = _ServiceMetrics()
 
-    def Detect(
+    async def Detect(
         self,
         request: "detection_pb2.DetectRequest",
-        context: grpc.ServicerContext,
+        context: grpc.aio.ServicerContext,
     ) -> "detection_pb2.DetectResponse":
         """Handle detection request."""
-        from .generated import detection_pb2
-
-        request_id = str(uuid.uuid4())[:8]
-        logger.info(
-            f"[{request_id}] Detection request from device: {request.device_id}, "
-            f"image size: {len(request.image)} bytes"
+        self._metrics.requests_total += 1
+        start_time = time.perf_counter()
+        request_id = format(next(self._request_counter) & 0xFFFFFFFF, "08x")
+        # Per-request logs are DEBUG with lazy %-args, so production pays nothing
+        # for them; aggregate numbers come from GetMetrics
+        logger.debug(
+            "[%s] Detection request from device: %s, image size: %d bytes",
+            request_id,
+            request.device_id,
+            len(request.image),
         )
 
         if not self.detector.model_loaded:
             context.set_code(grpc.StatusCode.UNAVAILABLE)
             context.set_details("Model not loaded")
-            return detection_pb2.DetectResponse()
+            return self._pb2.DetectResponse()
+
+        if not await self._admit():
+            self._metrics.rejected_total += 1
+            context.set_code(grpc.StatusCode.RESOURCE_EXHAUSTED)
+            context.set_details("Too many detection requests in flight")
+            return self._pb2.DetectResponse()
 
         try:
-            # Get thresholds (use 0 to indicate default)
-            conf_threshold = request.confidence_threshold if request.confidence_threshold > 0 else None
-            iou_threshold = request.iou_threshold if request.iou_threshold > 0 else None
+            conf_threshold, iou_threshold = self._thresholds(request)
+            future = await self._submit(request.image, conf_threshold, iou_threshold)
+            result = await asyncio.wrap_future(future)
+            response = self._build_response(result, request_id)
 
-            result = self.detector.detect(
-                image_bytes=request.image,
-                confidence_threshold=conf_threshold,
-                iou_threshold=iou_threshold,
+            self._metrics.detect_latencies_ms.append((time.perf_counter() - start_time) * 1000)
+            logger.debug(
+                "[%s] Found %d detections in %.1fms",
+                request_id,
+                len(response.detections),
+                result.inference_time_ms,
             )
 
-            # Build response
-            detections = []
-            for det in result.detections:
-                # Get SKU ID from mapping if available
-                sku_id = ""
-                if det.class_id in self.detector._class_mapping:
-                    sku_id = self.detector._class_mapping[det.class_id][0]
-
-                detections.append(
-                    detection_pb2.Detection(
-                        class_name=det.class_name,
-                        sku_id=sku_id,
-                        class_id=det.class_id,
-                        confidence=det.confidence,
-                        bbox=detection_pb2.BoundingBox(
-                            x1=det.x1,
-                            y1=det.y1,
-                            x2=det.x2,
-                            y2=det.y2,
-                        ),
-                    )
-                )
+            return response
+
+        except Exception as e:
+            logger.error(f"[{request_id}] Detection failed: {e}")
+            self._metrics.errors_total += 1
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(str(e))
+            return self._pb2.DetectResponse()
 
-            logger.info(
-                f"[{request_id}] Found {len(detections)} detections "
-                f"in {result.inference_time_ms:.1f}ms"
+        finally:
+            self._release()
+
+    async def DetectBatch(
+        self,
+        request: "detection_pb2.DetectBatchRequest",
+        context: grpc.aio.ServicerContext,
+    ) -> "detection_pb2.DetectBatchResponse":
+        """Handle batch detection request; each image takes an in-flight slot."""
+        self._metrics.requests_total += 1
+        request_id = format(next(self._request_counter) & 0xFFFFFFFF, "08x")
+        logger.debug(
+            "[%s] Batch detection request from device: %s, images: %d",
+            request_id,
+            request.device_id,
+            len(request.images),
+        )
+
+        if not self.detector.model_loaded:
+            context.set_code(grpc.StatusCode.UNAVAILABLE)
+            context.set_details("Model not loaded")
+            return self._pb2.DetectBatchResponse()
+
+        slots = max(1, len(request.images))
+        if slots > self._max_in_flight:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(
+                f"Batch of {slots} images exceeds the in-flight limit of {self._max_in_flight}"
             )
+            return self._pb2.DetectBatchResponse()
+
+        if not await self._admit(slots):
+            self._metrics.rejected_total += 1
+            context.set_code(grpc.StatusCode.RESOURCE_EXHAUSTED)
+            context.set_details("Too many detection requests in flight")
+            return self._pb2.DetectBatchResponse()
 
-            return detection_pb2.DetectResponse(
-                detections=detections,
-                model_version=result.model_version,
-                inference_time_ms=result.inference_time_ms,
-                request_id=request_id,
+        try:
+            conf_threshold, iou_threshold = self._thresholds(request)
+            # Queue every image before waiting so they land in the same batch
+            futures = await asyncio.gather(
+                *(self._submit(image, conf_threshold, iou_threshold) for image in request.images)
             )
+            results = await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+
+            response = self._pb2.DetectBatchResponse()
+            for result in results:
+                self._build_response(result, request_id, response.results.add())
+
+            logger.debug("[%s] Processed %d images", request_id, len(results))
+
+            return response
 
         except Exception as e:
-            logger.error(f"[{request_id}] Detection failed: {e}")
+            logger.error(f"[{request_id}] Batch detection failed: {e}")
+            self._metrics.errors_total += 1
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(str(e))
-            return detection_pb2.DetectResponse()
+            return self._pb2.DetectBatchResponse()
 
-    def HealthCheck(
+        finally:
+            self._release(slots)
+
+    async def DetectStream(
+        self,
+        request_iterator: AsyncIterator["detection_pb2.DetectRequest"],
+        context: grpc.aio.ServicerContext,
+    ) -> None:
+        """Handle a stream of detection requests, replying in request order.
+
+        Images are submitted as they arrive so later frames are decoded and
+        batched while earlier ones are still in the model. Each frame holds an
+        in-flight slot from submission until its response is written; a
+        saturated server slows the stream down rather than rejecting it.
+        Responses are sent with context.write() rather than yielded, which
+        keeps this a plain coroutine (mypyc cannot compile async generators).
+        """
+        self._metrics.requests_total += 1
+        request_id = format(next(self._request_counter) & 0xFFFFFFFF, "08x")
+        logger.debug("[%s] Detection stream opened", request_id)
+
+        if not self.detector.model_loaded:
+            context.set_code(grpc.StatusCode.UNAVAILABLE)
+            context.set_details("Model not loaded")
+            return
+
+        # Bounded so a fast client cannot queue unlimited decoded images
+        pending: asyncio.Queue = asyncio.Queue(maxsize=self.STREAM_PIPELINE_DEPTH)
+
+        async def submit_requests() -> None:
+            try:
+                async for request in request_iterator:
+                    conf_threshold, iou_threshold = self._thresholds(request)
+                    await self._in_flight.acquire()
+                    try:
+                        future = await self._submit(request.image, conf_threshold, iou_threshold)
+                        await pending.put(asyncio.wrap_future(future))
+                    except BaseException:
+                        self._in_flight.release()
+                        raise
+            finally:
+                await pending.put(None)
+
+        reader = asyncio.create_task(submit_requests())
+        count = 0
+        try:
+            while True:
+                result_future = await pending.get()
+                if result_future is None:
+                    break
+                try:
+                    await context.write(self._build_response(await result_future, request_id))
+                finally:
+                    self._in_flight.release()
+                count += 1
+
+            await reader  # surface errors raised while reading the stream
+            logger.debug("[%s] Detection stream closed after %d images", request_id, count)
+
+        except Exception as e:
+            logger.error(f"[{request_id}] Stream detection failed: {e}")
+            self._metrics.errors_total += 1
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(str(e))
+
+        finally:
+            reader.cancel()
+            # Frames still queued hold slots; drop them from the batcher
+            while not pending.empty():
+                queued = pending.get_nowait()
+                if queued is not None:
+                    queued.cancel()
+                    self._in_flight.release()
+
+    def _thresholds(
+        self,
+        request: "detection_pb2.DetectRequest | detection_pb2.DetectBatchRequest",
+    ) -> tuple[Optional[float], Optional[float]]:
+        """Read request thresholds, mapping 0 to the detector defaults."""
+        conf_threshold = request.confidence_threshold if request.confidence_threshold > 0 else None
+        iou_threshold = request.iou_threshold if request.iou_threshold > 0 else None
+        return conf_threshold, iou_threshold
+
+    async def _submit(
+        self,
+        image: bytes,
+        conf_threshold: Optional[float],
+        iou_threshold: Optional[float],
+    ) -> "Future[InferenceResult]":
+        """Decode on the executor and return the detector's batch future."""
+        self._metrics.images_total += 1
+        self._metrics.image_bytes_total += len(image)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(
+                self.detector.submit,
+                image_bytes=image,
+                confidence_threshold=conf_threshold,
+                iou_threshold=iou_threshold,
+            ),
+        )
+
+    async def _admit(self, slots: int = 1) -> bool:
+        """Take ``slots`` in-flight slots, waiting briefly before rejecting."""
+        deadline = time.perf_counter() + self.ADMISSION_TIMEOUT
+        for taken in range(slots):
+            if not self._in_flight.locked():
+                await self._in_flight.acquire()  # returns without suspending
+                continue
+
+            try:
+                await asyncio.wait_for(
+                    self._in_flight.acquire(), max(0.0, deadline - time.perf_counter())
+                )
+            except TimeoutError:
+                self._release(taken)
+                return False
+        return True
+
+    def _release(self, slots: int = 1) -> None:
+        """Return in-flight slots taken by _admit."""
+        for _ in range(slots):
+            self._in_flight.release()
+
+    def _build_response(
+        self,
+        result: InferenceResult,
+        request_id: str,
+        response: Optional["detection_pb2.DetectResponse"] = None,
+    ) -> "detection_pb2.DetectResponse":
+        """Build a DetectResponse, writing detections straight into the message.
+
+        Pass ``response`` to fill an existing message, such as a fresh entry
+        of a repeated field, instead of copying a finished one into place.
+        """
+        self._metrics.detections_total += len(result.detections)
+        self._metrics.inference_time_ms_sum += result.inference_time_ms
+
+        if response is None:
+            response = self._pb2.DetectResponse()
+        response.model_version = result.model_version
+        response.inference_time_ms = result.inference_time_ms
+        response.request_id = request_id
+
+        add_detection = response.detections.add
+        sku_by_id = self.detector._sku_by_id
+        sku_count = len(sku_by_id)
+        class_mapping = self.detector._class_mapping  # only used when the list is empty
+        for det in result.detections:
+            msg = add_detection(
+                class_name=det.class_name,
+                class_id=det.class_id,
+                confidence=det.confidence,
+            )
+
+            # Get SKU ID from mapping if available
+            if det.class_id < sku_count:
+                msg.sku_id = sku_by_id[det.class_id]
+            elif not sku_count and det.class_id in class_mapping:
+                msg.sku_id = class_mapping[det.class_id][0]
+
+            bbox = msg.bbox
+            bbox.x1 = det.x1
+            bbox.y1 = det.y1
+            bbox.x2 = det.x2
+            bbox.y2 = det.y2
+
+        return response
+
+    async def HealthCheck(
         self,
         request: "detection_pb2.Empty",
-        context: grpc.ServicerContext,
+        context: grpc.aio.ServicerContext,
     ) -> "detection_pb2.HealthResponse":
         """Handle health check request."""
-        from .generated import detection_pb2
-
-        uptime = int(time.time() - self.start_time)
-        model_loaded = self.detector.model_loaded
-
-        if model_loaded:
-            status = "healthy"
-            healthy = True
-        else:
-            status = "model_not_loaded"
-            healthy = False
-
-        return detection_pb2.HealthResponse(
-            healthy=healthy,
-            status=status,
-            model_loaded=model_loaded,
-            uptime_seconds=uptime,
+        template = (
+            self._healthy_response if self.detector.model_loaded else self._unhealthy_response
         )
 
-    def GetModelInfo(
+        response = self._pb2.HealthResponse()
+        response.CopyFrom(template)
+        response.uptime_seconds = int(time.time() - self.start_time)
+        return response
+
+    async def GetModelInfo(
         self,
         request: "detection_pb2.Empty",
-        context: grpc.ServicerContext,
+        context: grpc.aio.ServicerContext,
     ) -> "detection_pb2.ModelInfo":
         """Handle model info request."""
-        from .generated import detection_pb2
-
         info = self.detector.get_model_info()
 
-        return detection_pb2.ModelInfo(
+        return self._pb2.ModelInfo(
             version=info["version"],
             architecture=info["architecture"],
             class_names=info["class_names"],
@@ -139,14 +400,12 @@ class DetectionServicer:
             mAP50_95=0.0,  # TODO: Store in model metadata
         )
 
-    def SyncClasses(
+    async def SyncClasses(
         self,
         request: "detection_pb2.SyncClassesRequest",
-        context: grpc.ServicerContext,
+        context: grpc.aio.ServicerContext,
     ) -> "detection_pb2.SyncClassesResponse":
         """Handle class sync request from catalog service."""
-        from .generated import detection_pb2
-
         mapping = {}
         for cls in request.classes:
             mapping[cls.class_id] = (cls.sku_id, cls.class_name)
@@ -155,7 +414,29 @@ class DetectionServicer:
 
         logger.info(f"Synced {len(mapping)} classes from catalog")
 
-        return detection_pb2.SyncClassesResponse(
+        return self._pb2.SyncClassesResponse(
             success=True,
             class_count=len(mapping),
         )
+
+    async def GetMetrics(
+        self,
+        request: "detection_pb2.Empty",
+        context: grpc.aio.ServicerContext,
+    ) -> "detection_pb2.MetricsResponse":
+        """Handle metrics request.
+
+        Counters are per process: with GRPC_NUM_WORKERS > 1 each call reports
+        only the worker that answered it.
+        """
+        metrics = self._metrics
+        return self._pb2.MetricsResponse(
+            requests_total=metrics.requests_total,
+            images_total=metrics.images_total,
+            image_bytes_total=metrics.image_bytes_total,
+            detections_total=metrics.detections_total,
+            inference_time_ms_sum=metrics.inference_time_ms_sum,
+            errors_total=metrics.errors_total,
+            rejected_total=metrics.rejected_total,
+            detect_latency_p99_ms=metrics.latency_p99_ms(),
+        )
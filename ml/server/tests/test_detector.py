@@ -1,6 +1,10 @@
 """Tests for detector module."""
 
 import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
@@ -8,7 +12,13 @@ import pytest
 from PIL import Image
 
 from app.config import ModelConfig
-from app.detector import Detector, DetectionResult, InferenceResult
+from app.detector import (
+    Detector,
+    DetectionResult,
+    InferenceResult,
+    ModelWatcher,
+    _TensorSourcePredictor,
+)
 
 
 @pytest.fixture
@@ -74,6 +84,191 @@ class TestDetector:
         assert detector.model_loaded is True
         assert "cola" in detector.class_names
 
+    @patch("app.detector.YOLO")
+    def test_half_disabled_on_cpu(
+        self,
+        mock_yolo_class: MagicMock,
+        model_config: ModelConfig,
+    ) -> None:
+        """Test FP16 is not used when running on CPU."""
+        model_config.model_dir.mkdir(parents=True)
+        model_config.model_path.write_text("mock model")
+        model_config.device = "cpu"
+        model_config.half = True
+
+        mock_model = MagicMock()
+        mock_model.predict.return_value = []
+        mock_yolo_class.return_value = mock_model
+
+        detector = Detector(model_config)
+        detector.load_model()
+
+        mock_model.to.assert_called_once_with("cpu")
+        _, kwargs = mock_model.predict.call_args
+        assert kwargs["half"] is False
+        assert kwargs["device"] == "cpu"
+
+    @patch("app.detector.YOLO")
+    def test_bare_gpu_index_is_moved_as_cuda_device(
+        self,
+        mock_yolo_class: MagicMock,
+        model_config: ModelConfig,
+    ) -> None:
+        """Test YOLO_DEVICE=0 moves the model to cuda:0, which torch accepts."""
+        model_config.model_dir.mkdir(parents=True)
+        model_config.model_path.write_text("mock model")
+        model_config.device = "0"
+
+        mock_model = MagicMock()
+        mock_model.predict.return_value = []
+        mock_yolo_class.return_value = mock_model
+
+        detector = Detector(model_config)
+        with patch.object(detector, "_get_warmup_input", return_value=MagicMock()):
+            detector.load_model()
+
+        mock_model.to.assert_called_once_with("cuda:0")
+
+    def test_warmup_covers_batch_buckets(self, model_config: ModelConfig) -> None:
+        """Test GPU warm-up runs each power-of-two batch size and max_batch."""
+        model_config.max_batch = 12
+        model_config.device = "cpu"
+        assert Detector(model_config)._warmup_batch_sizes() == [1]
+
+        model_config.device = "0"
+        assert Detector(model_config)._warmup_batch_sizes() == [1, 2, 4, 8, 12]
+
+        model_config.max_batch = 1
+        assert Detector(model_config)._warmup_batch_sizes() == [1]
+
+    @patch("app.detector.YOLO")
+    def test_export_failure_falls_back_to_pytorch(
+        self,
+        mock_yolo_class: MagicMock,
+        model_config: ModelConfig,
+    ) -> None:
+        """Test a failed engine export still loads the PyTorch checkpoint."""
+        model_config.model_dir.mkdir(parents=True)
+        model_config.model_path.write_text("mock model")
+        model_config.engine_format = "onnx"
+
+        mock_model = MagicMock()
+        mock_model.names = {0: "cola"}
+        mock_model.predict.return_value = []
+        mock_model.export.side_effect = RuntimeError("export failed")
+        mock_yolo_class.return_value = mock_model
+
+        detector = Detector(model_config)
+
+        assert detector.load_model() is True
+        mock_yolo_class.assert_called_with(str(model_config.model_path))
+
+    @patch("app.detector.YOLO")
+    def test_export_uses_dynamic_batch(
+        self,
+        mock_yolo_class: MagicMock,
+        model_config: ModelConfig,
+    ) -> None:
+        """Test engine exports accept the batcher's largest batch."""
+        model_config.model_dir.mkdir(parents=True)
+        model_config.model_path.write_text("mock model")
+        model_config.engine_format = "onnx"
+        model_config.max_batch = 8
+
+        mock_model = MagicMock()
+        mock_model.export.side_effect = RuntimeError("export failed")
+        mock_yolo_class.return_value = mock_model
+
+        Detector(model_config).load_model()
+
+        _, kwargs = mock_model.export.call_args
+        assert kwargs["batch"] == 8
+        assert kwargs["dynamic"] is True
+
+    @patch("app.detector.YOLO")
+    def test_cached_export_is_keyed_by_build_parameters(
+        self,
+        mock_yolo_class: MagicMock,
+        model_config: ModelConfig,
+    ) -> None:
+        """Test a cached export is only reused when it was built for this config."""
+        model_config.model_dir.mkdir(parents=True)
+        model_config.model_path.write_text("mock model")
+        model_config.engine_format = "onnx"
+        model_config.max_batch = 16
+        cached = model_config.model_dir / "test.b16.fp32.640.onnx"
+        cached.write_text("cached export")
+
+        assert Detector(model_config)._export_model(model_config.model_path) == cached
+        mock_yolo_class.return_value.export.assert_not_called()
+
+        def export(**_):
+            exported = Path(mock_yolo_class.call_args.args[0]).with_suffix(".onnx")
+            exported.write_text("new export")
+            return str(exported)
+
+        mock_yolo_class.return_value.export.side_effect = export
+        model_config.max_batch = 32
+        export_path = Detector(model_config)._export_model(model_config.model_path)
+
+        assert export_path == model_config.model_dir / "test.b32.fp32.640.onnx"
+        assert export_path.read_text() == "new export"
+        assert sorted(p.name for p in model_config.model_dir.iterdir()) == [
+            ".test.b32.fp32.640.onnx.lock",
+            "test.b16.fp32.640.onnx",
+            "test.b32.fp32.640.onnx",
+            "test.pt",
+        ]
+
+    @patch("app.detector.YOLO")
+    def test_concurrent_exports_build_once(
+        self,
+        mock_yolo_class: MagicMock,
+        model_config: ModelConfig,
+    ) -> None:
+        """Test detectors exporting at the same time share a single export."""
+        model_config.model_dir.mkdir(parents=True)
+        model_config.model_path.write_text("mock model")
+        model_config.engine_format = "onnx"
+
+        def export(**_):
+            time.sleep(0.1)
+            exported = Path(mock_yolo_class.call_args.args[0]).with_suffix(".onnx")
+            exported.write_text("export")
+            return str(exported)
+
+        mock_yolo_class.return_value.export.side_effect = export
+        detectors = [Detector(model_config) for _ in range(3)]
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            paths = list(executor.map(lambda d: d.export_model(), detectors))
+
+        assert mock_yolo_class.return_value.export.call_count == 1
+        assert len(set(paths)) == 1
+        assert paths[0].read_text() == "export"
+
+    @patch("app.detector.YOLO")
+    def test_int8_calibration_only_applies_to_engine(
+        self,
+        mock_yolo_class: MagicMock,
+        model_config: ModelConfig,
+    ) -> None:
+        """Test calibration data requests INT8 for TensorRT but not for ONNX."""
+        model_config.model_dir.mkdir(parents=True)
+        model_config.model_path.write_text("mock model")
+        model_config.calibration_data = "data.yaml"
+
+        mock_model = MagicMock()
+        mock_model.export.side_effect = RuntimeError("export failed")
+        mock_yolo_class.return_value = mock_model
+
+        for engine_format, int8 in (("onnx", False), ("engine", True)):
+            model_config.engine_format = engine_format
+            Detector(model_config)._export_model(model_config.model_path)
+
+            _, kwargs = mock_model.export.call_args
+            assert kwargs.get("int8", False) is int8
+
     def test_detect_without_model(
         self,
         model_config: ModelConfig,
@@ -105,9 +300,7 @@ class TestDetector:
 
         # Mock detection result
         mock_boxes = MagicMock()
-        mock_boxes.cls = torch.tensor([0])
-        mock_boxes.conf = torch.tensor([0.95])
-        mock_boxes.xyxy = torch.tensor([[100, 100, 200, 200]])
+        mock_boxes.data = torch.tensor([[100, 100, 200, 200, 0.95, 0]])
         mock_boxes.__len__ = lambda self: 1
 
         mock_result = MagicMock()
@@ -125,6 +318,215 @@ class TestDetector:
         assert len(result.detections) == 1
         assert result.detections[0].class_name == "cola"
         assert result.detections[0].confidence == pytest.approx(0.95)
+        assert result.detections[0].x1 == pytest.approx(100 / 640)
+        assert result.detections[0].y2 == pytest.approx(200 / 480)
+
+    @patch("app.detector.YOLO")
+    def test_concurrent_detects_are_batched(
+        self,
+        mock_yolo_class: MagicMock,
+        model_config: ModelConfig,
+        sample_image_bytes: bytes,
+    ) -> None:
+        """Test concurrent detections share a single predict call."""
+        model_config.model_dir.mkdir(parents=True)
+        model_config.model_path.write_text("mock model")
+        model_config.max_batch = 4
+        model_config.batch_wait_ms = 500.0
+
+        mock_result = MagicMock()
+        mock_result.boxes = None
+
+        mock_model = MagicMock()
+        mock_model.names = {0: "cola"}
+        mock_model.predict.side_effect = lambda images, **_: (
+            [mock_result] * len(images) if isinstance(images, list) else []
+        )
+        mock_yolo_class.return_value = mock_model
+
+        detector = Detector(model_config)
+        detector.load_model()
+        mock_model.predict.reset_mock()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: detector.detect(sample_image_bytes), range(4)))
+
+        assert len(results) == 4
+        assert mock_model.predict.call_count == 1
+        batch = mock_model.predict.call_args.args[0]
+        assert len(batch) == 4
+
+    @patch("app.detector.YOLO")
+    def test_unbatched_predicts_do_not_overlap(
+        self,
+        mock_yolo_class: MagicMock,
+        model_config: ModelConfig,
+        sample_image_bytes: bytes,
+    ) -> None:
+        """Test predict is never entered concurrently with batching disabled."""
+        model_config.model_dir.mkdir(parents=True)
+        model_config.model_path.write_text("mock model")
+        model_config.max_batch = 1
+
+        mock_result = MagicMock()
+        mock_result.boxes = None
+        active = 0
+        overlaps = []
+
+        def predict(images, **_):
+            nonlocal active
+            active += 1
+            overlaps.append(active)
+            time.sleep(0.02)
+            active -= 1
+            return [mock_result] * len(images) if isinstance(images, list) else []
+
+        mock_model = MagicMock()
+        mock_model.predict.side_effect = predict
+        mock_yolo_class.return_value = mock_model
+
+        detector = Detector(model_config)
+        detector.load_model()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda _: detector.detect(sample_image_bytes), range(8)))
+
+        assert max(overlaps) == 1
+
+    @patch("app.detector.YOLO")
+    def test_cancelled_request_does_not_stop_batching(
+        self,
+        mock_yolo_class: MagicMock,
+        model_config: ModelConfig,
+        sample_image_bytes: bytes,
+    ) -> None:
+        """Test a request cancelled while queued is dropped without killing the worker."""
+        model_config.model_dir.mkdir(parents=True)
+        model_config.model_path.write_text("mock model")
+        model_config.max_batch = 4
+        model_config.batch_wait_ms = 200.0
+
+        mock_result = MagicMock()
+        mock_result.boxes = None
+
+        mock_model = MagicMock()
+        mock_model.names = {0: "cola"}
+        mock_model.predict.side_effect = lambda images, **_: (
+            [mock_result] * len(images) if isinstance(images, list) else []
+        )
+        mock_yolo_class.return_value = mock_model
+
+        detector = Detector(model_config)
+        detector.load_model()
+        mock_model.predict.reset_mock()
+
+        cancelled = detector.submit(sample_image_bytes)
+        assert cancelled.cancel()
+        pending = detector.submit(sample_image_bytes)
+
+        assert pending.result(timeout=5).detections == []
+        assert len(mock_model.predict.call_args.args[0]) == 1
+        assert detector.detect(sample_image_bytes).detections == []
+
+    def test_decode_image_returns_bgr(self, model_config: ModelConfig) -> None:
+        """Test decoded images use the BGR layout Ultralytics expects."""
+        img = Image.new("RGB", (32, 16), color=(255, 0, 0))
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG")
+
+        detector = Detector(model_config)
+        decoded = detector._decode_image(buffer.getvalue())
+
+        assert decoded.shape == (16, 32, 3)
+        assert decoded[0, 0].tolist() == [0, 0, 255]
+
+    def test_decode_image_ignores_exif_orientation(self, model_config: ModelConfig) -> None:
+        """Test JPEGs decode in stored orientation whichever decoder is used."""
+        img = Image.new("RGB", (64, 32), color="red")
+        exif = img.getexif()
+        exif[0x0112] = 6  # rotate 90 degrees clockwise on display
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", exif=exif.tobytes())
+
+        detector = Detector(model_config)
+        detector._jpeg_decoder_failed = True  # force the OpenCV path
+        decoded = detector._decode_image(buffer.getvalue())
+
+        assert decoded.shape == (32, 64, 3)
+
+    @patch("app.detector.TJPF_BGR", 0, create=True)
+    def test_decode_image_falls_back_when_turbojpeg_fails(
+        self,
+        model_config: ModelConfig,
+        sample_image_bytes: bytes,
+    ) -> None:
+        """Test JPEGs libjpeg-turbo rejects are still decoded by OpenCV."""
+        decoder = MagicMock()
+        decoder.decode.side_effect = OSError("Unsupported color conversion request")
+
+        detector = Detector(model_config)
+        with patch.object(detector, "_get_jpeg_decoder", return_value=decoder):
+            decoded = detector._decode_image(sample_image_bytes)
+
+        decoder.decode.assert_called_once()
+        assert decoded.shape == (480, 640, 3)
+
+    def test_decode_image_accepts_memoryview(
+        self,
+        model_config: ModelConfig,
+        sample_image_bytes: bytes,
+    ) -> None:
+        """Test images can be decoded from a buffer without copying to bytes."""
+        detector = Detector(model_config)
+        decoded = detector._decode_image(memoryview(sample_image_bytes))
+
+        assert decoded.shape == (480, 640, 3)
+
+    def test_preprocess_batch_letterboxes(self, model_config: ModelConfig) -> None:
+        """Test on-device preprocessing resizes, pads and flips to RGB."""
+        import numpy as np
+
+        image = np.zeros((240, 320, 3), dtype=np.uint8)
+        image[:, :, 2] = 255  # red in BGR
+
+        detector = Detector(model_config)
+        batch, letterboxes = detector._preprocess_batch([image])
+
+        assert batch.shape == (1, 3, 640, 640)
+        assert letterboxes == [(2.0, 0, 80)]
+        assert batch[0, :, 0, 0].tolist() == pytest.approx([114 / 255] * 3)
+        assert batch[0, :, 320, 320].tolist() == pytest.approx([1.0, 0.0, 0.0])
+
+    def test_tensor_source_is_not_copied_to_host(self) -> None:
+        """Test postprocessing gets shape-only stand-ins for a tensor batch."""
+        import torch
+
+        predictor = object.__new__(_TensorSourcePredictor)
+        with patch(
+            "ultralytics.models.yolo.detect.DetectionPredictor.postprocess", return_value=[]
+        ) as postprocess:
+            predictor.postprocess([], torch.zeros(2, 3, 64, 96), torch.zeros(2, 3, 64, 96))
+
+        orig_imgs = postprocess.call_args.args[2]
+        assert isinstance(orig_imgs, list)
+        assert [image.shape for image in orig_imgs] == [(64, 96, 3)] * 2
+
+    def test_parse_result_undoes_letterbox(self, model_config: ModelConfig) -> None:
+        """Test boxes from a letterboxed input map back to the original image."""
+        import numpy as np
+        import torch
+
+        boxes = MagicMock()
+        boxes.data = torch.tensor([[160.0, 80.0, 480.0, 560.0, 0.9, 0.0]])
+        boxes.__len__ = lambda self: 1
+        result = MagicMock()
+        result.boxes = boxes
+
+        detector = Detector(model_config)
+        image = np.zeros((240, 320, 3), dtype=np.uint8)
+        (det,) = detector._parse_result(result, image, {0: "cola"}, letterbox=(2.0, 0, 80))
+
+        assert (det.x1, det.y1, det.x2, det.y2) == pytest.approx((0.25, 0.0, 0.75, 1.0))
 
     def test_update_class_mapping(self, model_config: ModelConfig) -> None:
         """Test updating class mapping."""
@@ -137,3 +539,55 @@ class TestDetector:
         detector.update_class_mapping(mapping)
 
         assert detector._class_mapping == mapping
+        assert detector._sku_by_id == ["sku-001", "sku-002"]
+
+    def test_sku_lookup_leaves_gaps_empty(self, model_config: ModelConfig) -> None:
+        """Test unmapped class IDs below the highest mapped ID have no SKU."""
+        detector = Detector(model_config)
+
+        detector.update_class_mapping({2: ("sku-003", "Fanta")})
+
+        assert detector._sku_by_id == ["", "", "sku-003"]
+
+    def test_sparse_class_ids_skip_the_dense_lookup(self, model_config: ModelConfig) -> None:
+        """Test huge class IDs do not allocate a list sized to the largest ID."""
+        detector = Detector(model_config)
+
+        detector.update_class_mapping({0: ("sku-001", "Cola"), 10**9: ("sku-big", "Fanta")})
+
+        assert detector._sku_by_id == []
+        assert detector._class_mapping[10**9] == ("sku-big", "Fanta")
+
+
+class TestModelWatcher:
+    """Tests for ModelWatcher class."""
+
+    def test_reload_on_notification(self, tmp_path: Path) -> None:
+        """Test a replaced model file triggers the callback."""
+        model_path = tmp_path / "best.pt"
+        model_path.write_text("v1")
+        changed = threading.Event()
+
+        watcher = ModelWatcher(model_path, on_change=changed.set, interval=60.0)
+        watcher.start()
+        try:
+            time.sleep(0.1)
+            model_path.write_text("v2")
+            os.utime(model_path, (time.time() + 10, time.time() + 10))
+            assert changed.wait(timeout=5.0)
+        finally:
+            watcher.stop()
+
+    def test_polls_when_directory_missing(self, tmp_path: Path) -> None:
+        """Test the watcher falls back to polling before the model dir exists."""
+        model_path = tmp_path / "models" / "best.pt"
+        changed = threading.Event()
+
+        watcher = ModelWatcher(model_path, on_change=changed.set, interval=0.1)
+        watcher.start()
+        try:
+            model_path.parent.mkdir()
+            model_path.write_text("v1")
+            assert changed.wait(timeout=5.0)
+        finally:
+            watcher.stop()
@@ -0,0 +1,221 @@
+"""Tests for servicer module."""
+
+import asyncio
+import time
+from concurrent.futures import Future
+from unittest.mock import AsyncMock, MagicMock
+
+import grpc
+import pytest
+
+from app.detector import DetectionResult, InferenceResult
+from app.servicer import DetectionServicer
+
+detection_pb2 = pytest.importorskip(
+    "app.generated.detection_pb2", reason="protobuf code not generated (run `make proto`)"
+)
+
+
+@pytest.fixture
+def detector() -> MagicMock:
+    """Create mock detector with a loaded model."""
+    detector = MagicMock()
+    detector.model_loaded = True
+    detector._sku_by_id = ["sku-001"]
+    detector._class_mapping = {0: ("sku-001", "Coca-Cola")}
+    result = InferenceResult(
+        detections=[
+            DetectionResult(
+                class_id=0,
+                class_name="Coca-Cola",
+                confidence=0.9,
+                x1=0.1,
+                y1=0.2,
+                x2=0.3,
+                y2=0.4,
+            ),
+            DetectionResult(
+                class_id=5,
+                class_name="class_5",
+                confidence=0.6,
+                x1=0.5,
+                y1=0.5,
+                x2=0.6,
+                y2=0.6,
+            ),
+        ],
+        inference_time_ms=12.5,
+        model_version="v1",
+    )
+    future: Future = Future()
+    future.set_result(result)
+    detector.submit.return_value = future
+    return detector
+
+
+class TestDetectionServicer:
+    """Tests for DetectionServicer class."""
+
+    def test_detect_builds_response(self, detector: MagicMock) -> None:
+        """Test detections are converted to protobuf with SKU IDs."""
+        servicer = DetectionServicer(detector, start_time=time.time())
+        context = MagicMock()
+
+        response = asyncio.run(servicer.Detect(detection_pb2.DetectRequest(image=b"img"), context))
+
+        assert len(response.detections) == 2
+        assert response.detections[0].sku_id == "sku-001"
+        assert response.detections[0].bbox.x2 == pytest.approx(0.3)
+        assert response.detections[1].sku_id == ""
+        assert response.model_version == "v1"
+        assert response.request_id
+        context.set_code.assert_not_called()
+
+    def test_detect_falls_back_to_sparse_mapping(self, detector: MagicMock) -> None:
+        """Test SKU IDs come from the mapping dict when there is no dense list."""
+        detector._sku_by_id = []
+        detector._class_mapping = {5: ("sku-005", "class_5")}
+        servicer = DetectionServicer(detector, start_time=time.time())
+
+        response = asyncio.run(
+            servicer.Detect(detection_pb2.DetectRequest(image=b"img"), MagicMock())
+        )
+
+        assert response.detections[0].sku_id == ""
+        assert response.detections[1].sku_id == "sku-005"
+
+    def test_detect_without_model(self, detector: MagicMock) -> None:
+        """Test detection is rejected while no model is loaded."""
+        detector.model_loaded = False
+        servicer = DetectionServicer(detector, start_time=time.time())
+        context = MagicMock()
+
+        response = asyncio.run(servicer.Detect(detection_pb2.DetectRequest(image=b"img"), context))
+
+        assert len(response.detections) == 0
+        context.set_code.assert_called_once_with(grpc.StatusCode.UNAVAILABLE)
+
+    def test_detect_sheds_load_when_saturated(self, detector: MagicMock) -> None:
+        """Test detection is rejected once all in-flight slots are taken."""
+        servicer = DetectionServicer(detector, start_time=time.time(), max_in_flight=1)
+        context = MagicMock()
+
+        async def detect_while_saturated():
+            await servicer._in_flight.acquire()
+            return await servicer.Detect(detection_pb2.DetectRequest(image=b"img"), context)
+
+        response = asyncio.run(detect_while_saturated())
+
+        assert len(response.detections) == 0
+        context.set_code.assert_called_once_with(grpc.StatusCode.RESOURCE_EXHAUSTED)
+        detector.submit.assert_not_called()
+
+    def test_detect_batch_returns_result_per_image(self, detector: MagicMock) -> None:
+        """Test each batched image gets its own response in order."""
+        servicer = DetectionServicer(detector, start_time=time.time())
+        context = MagicMock()
+        request = detection_pb2.DetectBatchRequest(images=[b"a", b"b", b"c"])
+
+        response = asyncio.run(servicer.DetectBatch(request, context))
+
+        assert len(response.results) == 3
+        assert detector.submit.call_count == 3
+        assert response.results[2].detections[0].sku_id == "sku-001"
+        context.set_code.assert_not_called()
+
+    def test_detect_batch_takes_a_slot_per_image(self, detector: MagicMock) -> None:
+        """Test a batch is rejected when there are fewer free slots than images."""
+        servicer = DetectionServicer(detector, start_time=time.time(), max_in_flight=2)
+        context = MagicMock()
+        request = detection_pb2.DetectBatchRequest(images=[b"a", b"b"])
+
+        async def detect_batch_while_busy():
+            await servicer._in_flight.acquire()
+            response = await servicer.DetectBatch(request, context)
+            servicer._in_flight.release()
+            return response
+
+        response = asyncio.run(detect_batch_while_busy())
+
+        assert len(response.results) == 0
+        context.set_code.assert_called_once_with(grpc.StatusCode.RESOURCE_EXHAUSTED)
+        detector.submit.assert_not_called()
+        assert not servicer._in_flight.locked()
+
+    def test_detect_batch_over_limit_is_invalid(self, detector: MagicMock) -> None:
+        """Test a batch that could never be admitted is rejected outright."""
+        servicer = DetectionServicer(detector, start_time=time.time(), max_in_flight=2)
+        context = MagicMock()
+        request = detection_pb2.DetectBatchRequest(images=[b"a", b"b", b"c"])
+
+        asyncio.run(servicer.DetectBatch(request, context))
+
+        context.set_code.assert_called_once_with(grpc.StatusCode.INVALID_ARGUMENT)
+        detector.submit.assert_not_called()
+
+    def test_detect_stream_takes_a_slot_per_frame(self, detector: MagicMock) -> None:
+        """Test stream frames release their slot once the response is written."""
+        servicer = DetectionServicer(detector, start_time=time.time(), max_in_flight=1)
+        context = MagicMock()
+        context.write = AsyncMock()
+
+        async def requests():
+            for image in (b"a", b"b", b"c"):
+                yield detection_pb2.DetectRequest(image=image)
+
+        asyncio.run(servicer.DetectStream(requests(), context))
+
+        assert context.write.await_count == 3
+        assert not servicer._in_flight.locked()
+        context.set_code.assert_not_called()
+
+    def test_detect_stream_replies_per_request(self, detector: MagicMock) -> None:
+        """Test the stream yields one response per incoming request."""
+        servicer = DetectionServicer(detector, start_time=time.time())
+        context = MagicMock()
+        context.write = AsyncMock()
+
+        async def requests():
+            for image in (b"a", b"b"):
+                yield detection_pb2.DetectRequest(image=image)
+
+        asyncio.run(servicer.DetectStream(requests(), context))
+
+        responses = [call.args[0] for call in context.write.await_args_list]
+        assert len(responses) == 2
+        assert all(len(r.detections) == 2 for r in responses)
+        context.set_code.assert_not_called()
+
+    def test_health_check_reflects_model_state(self, detector: MagicMock) -> None:
+        """Test health responses follow the model state and do not share state."""
+        servicer = DetectionServicer(detector, start_time=time.time() - 30)
+
+        healthy = asyncio.run(servicer.HealthCheck(detection_pb2.Empty(), MagicMock()))
+        detector.model_loaded = False
+        unhealthy = asyncio.run(servicer.HealthCheck(detection_pb2.Empty(), MagicMock()))
+
+        assert healthy.healthy and healthy.status == "healthy"
+        assert healthy.uptime_seconds >= 30
+        assert not unhealthy.healthy and unhealthy.status == "model_not_loaded"
+        assert servicer._healthy_response.uptime_seconds == 0
+
+    def test_get_metrics_counts_requests(self, detector: MagicMock) -> None:
+        """Test detections and rejections are reflected in the metrics."""
+        servicer = DetectionServicer(detector, start_time=time.time(), max_in_flight=1)
+
+        async def run():
+            await servicer.Detect(detection_pb2.DetectRequest(image=b"img"), MagicMock())
+            await servicer._in_flight.acquire()
+            await servicer.Detect(detection_pb2.DetectRequest(image=b"img"), MagicMock())
+            return await servicer.GetMetrics(detection_pb2.Empty(), MagicMock())
+
+        metrics = asyncio.run(run())
+
+        assert metrics.requests_total == 2
+        assert metrics.images_total == 1
+        assert metrics.image_bytes_total == 3
+        assert metrics.detections_total == 2
+        assert metrics.inference_time_ms_sum == pytest.approx(12.5)
+        assert metrics.rejected_total == 1
+        assert metrics.errors_total == 0
+        assert metrics.detect_latency_p99_ms > 0
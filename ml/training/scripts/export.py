@@ -6,6 +6,7 @@ import shutil
 import sys
 from pathlib import Path
 
+import torch
 from ultralytics import YOLO
 
 
@@ -27,17 +28,42 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--format",
         type=str,
-        default="pytorch",
+        default="onnx",
         choices=["pytorch", "onnx", "tflite", "torchscript"],
         help="Export format",
     )
     parser.add_argument("--imgsz", type=int, default=640, help="Image size")
-    parser.add_argument("--half", action="store_true", help="FP16 quantization")
-    parser.add_argument("--int8", action="store_true", help="INT8 quantization (requires calibration)")
+    parser.add_argument(
+        "--half",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="FP16 quantization (default: on for ONNX when CUDA is available)",
+    )
+    parser.add_argument(
+        "--int8", action="store_true", help="INT8 quantization for TFLite (requires calibration)"
+    )
+    parser.add_argument(
+        "--calib-data",
+        type=str,
+        default=None,
+        help="Dataset YAML used to calibrate INT8 quantization",
+    )
     parser.add_argument("--simplify", action="store_true", help="Simplify ONNX model")
     parser.add_argument("--opset", type=int, default=17, help="ONNX opset version")
 
-    return parser.parse_args()
+    args = parser.parse_args()
+
+    if args.half is None:
+        # Other formats keep their FP32 default unless --half is passed
+        args.half = args.format == "onnx" and torch.cuda.is_available()
+    if args.format == "onnx":
+        # Ultralytics has no INT8 ONNX export, and only exports FP16 ONNX on a GPU
+        if args.int8:
+            parser.error("--int8 is only supported with --format tflite")
+        if args.half and not torch.cuda.is_available():
+            parser.error("--half ONNX export requires CUDA")
+
+    return args
 
 
 def main() -> int:
@@ -47,6 +73,8 @@ def main() -> int:
     print(f"  Format: {args.format}")
     print(f"  Output: {args.output_dir}")
     print(f"  Image size: {args.imgsz}")
+    if args.format in ("onnx", "tflite"):
+        print(f"  Precision: {'int8' if args.int8 else 'fp16' if args.half else 'fp32'}")
 
     # Load model
     model = YOLO(args.model)
@@ -65,7 +93,9 @@ def main() -> int:
         exported_path = model.export(
             format="onnx",
             imgsz=args.imgsz,
+            dynamic=True,  # the server batches concurrent requests
             half=args.half,
+            device=0 if args.half else "cpu",
             simplify=args.simplify,
             opset=args.opset,
         )
@@ -79,6 +109,7 @@ def main() -> int:
             imgsz=args.imgsz,
             half=args.half,
             int8=args.int8,
+            data=args.calib_data,
         )
         output_path = output_dir / "model.tflite"
         shutil.move(exported_path, output_path)
@@ -4,7 +4,7 @@
 import argparse
 import os
 import sys
-from datetime import datetime
+import time
 from pathlib import Path
 
 from ultralytics import YOLO
@@ -57,8 +57,7 @@ def main() -> int:
 
     # Set experiment name
     if args.name is None:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        args.name = f"beverages_{timestamp}"
+        args.name = f"beverages_{time.strftime('%Y%m%d_%H%M%S')}"
 
     print(f"Starting training: {args.name}")
     print(f"  Model: {args.model}")